@@ -1,11 +1,18 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from ingest_pipeline import ingest_github_repo, search_similar_chunks, get_all_repositories, delete_repository
+from ingest_pipeline import (
+    ingest_github_repo,
+    search_similar_chunks,
+    get_all_repositories,
+    delete_repository,
+    get_elasticsearch_client,
+)
 from config import OPENAI_API_KEY
 from langchain_openai import ChatOpenAI
 from security_assessment import (
     run_repo_security_assessment,
     run_file_security_assessment,
+    invalidate_assessment_cache,
 )
 from prompts import get_file_tagged_prompt, get_general_query_prompt, get_chat_prompt
 
@@ -13,7 +20,6 @@ import os
 from typing import Any, Dict, Optional
 from github import Github, UnknownObjectException, Auth
 from dotenv import load_dotenv
-from elasticsearch import Elasticsearch
 import base64
 
 load_dotenv()
@@ -78,6 +84,7 @@ def ingest():
 
     try:
         ingest_github_repo(github_url, openai_api_key=api_key)
+        invalidate_assessment_cache(*github_url.rstrip("/").split("/")[-2:])
         return jsonify({"status": "completed"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -479,6 +486,7 @@ def delete_single_repository(owner: str, repo: str):
     """Delete a specific repository from Elasticsearch."""
     try:
         deleted_count = delete_repository(owner, repo)
+        invalidate_assessment_cache(owner, repo)
 
         if deleted_count == 0:
             return jsonify({
@@ -507,11 +515,7 @@ def clear_repositories():
         if not es_host or not es_user or not es_password:
             return jsonify({"status": "error", "message": "Elasticsearch credentials not configured."}), 500
 
-        es = Elasticsearch(
-            hosts=[es_host],
-            basic_auth=(es_user, es_password),
-            verify_certs=False
-        )
+        es = get_elasticsearch_client()
 
         # Check if index exists
         if not es.indices.exists(index="repo_chunks"):
@@ -525,6 +529,7 @@ def clear_repositories():
         )
 
         deleted_count = delete_result["deleted"]
+        invalidate_assessment_cache()
 
         return jsonify({
             "status": "success",
@@ -0,0 +1,187 @@
+"""
+Chunk-size regularization for text splitting.
+
+RecursiveCharacterTextSplitter only bounds chunks from above: a short section
+between two separators still becomes its own low-signal chunk, and a span with
+no usable separator can come out over size. split_then_merge adds a post-pass
+that merges neighbours up to a ceiling and folds leftover fragments away, so
+chunk sizes stay within predictable bounds and fewer chunks reach the embedder.
+"""
+
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+
+# Chunking configuration shared by ingestion and the test scripts. Changing the
+# size or overlap changes every chunk ID, so existing repositories get re-embedded.
+CHUNK_SIZE = 1000  # chunk_size handed to the recursive splitter
+CHUNK_OVERLAP = 100
+MIN_CHUNK_SIZE = 100  # Fragments shorter than this are folded into a neighbour
+MAX_CHUNK_SIZE = 1100  # Neighbours are merged while the result stays within this
+
+
+# File extension -> language used for language-aware splitting (respects function/class boundaries)
+EXT_LANGUAGE_MAP = {
+    ".py": Language.PYTHON,
+    ".js": Language.JS,
+    ".ts": Language.TS,
+    ".java": Language.JAVA,
+    ".go": Language.GO,
+    ".cs": Language.CSHARP,
+    ".cpp": Language.CPP,
+    ".c": Language.C,
+    ".php": Language.PHP,
+    ".rb": Language.RUBY,
+    ".rs": Language.RUST,
+    ".scala": Language.SCALA,
+    ".swift": Language.SWIFT,
+    ".sol": Language.SOL,
+    ".kt": Language.KOTLIN,
+    ".lua": Language.LUA,
+    ".pl": Language.PERL,
+    ".hs": Language.HASKELL,
+    ".ps1": Language.POWERSHELL,
+    ".html": Language.HTML,
+    ".tex": Language.LATEX,
+    ".md": Language.MARKDOWN,
+    ".proto": Language.PROTO,
+    ".rst": Language.RST,
+    ".cob": Language.COBOL,
+    ".ex": Language.ELIXIR,
+    ".exs": Language.ELIXIR,
+}
+
+
+@lru_cache(maxsize=64)
+def get_splitter(language: Optional[Language], chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """
+    Get the shared splitter for (language, size, overlap), building it on first use.
+
+    Splitting is stateless, so one instance serves every file and thread. Languages
+    the installed langchain has no separators for (from_language raises ValueError)
+    fall back to the generic splitter instead of failing.
+    """
+    if language is not None:
+        try:
+            return RecursiveCharacterTextSplitter.from_language(
+                language=language, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+            )
+        except ValueError as e:
+            print(f"Warning: No language-aware splitter for {language} ({e}); using generic splitting")
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def file_extension(path: str) -> str:
+    """Return a path's lowercased extension ("" if it has none)."""
+    return os.path.splitext(path)[1].lower()
+
+
+def language_for(path: str) -> Optional[Language]:
+    """Return the splitting language for a file path, or None for generic text."""
+    return EXT_LANGUAGE_MAP.get(file_extension(path))
+
+
+def splitter_for(
+    path: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP
+) -> RecursiveCharacterTextSplitter:
+    """Get the shared splitter for a file path: language-aware for code, generic otherwise."""
+    return get_splitter(language_for(path), chunk_size, chunk_overlap)
+
+
+def _split_spans(
+    text: str, start: int, end: int, splitter: RecursiveCharacterTextSplitter, overlap: int
+) -> Optional[List[Tuple[int, int]]]:
+    """
+    Split text[start:end] and locate each chunk as an absolute (start, end) span.
+
+    Chunks are searched for from just before the previous chunk's end, the same
+    way the splitter's own add_start_index does. Returns None if a chunk cannot be
+    located (the splitter rewrote it), in which case spans are not usable.
+    """
+    segment = text[start:end]
+    spans = []
+    index = 0
+    previous_len = 0
+    for chunk in splitter.split_text(segment):
+        index = segment.find(chunk, max(0, index + previous_len - overlap))
+        if index < 0:
+            return None
+        spans.append((start + index, start + index + len(chunk)))
+        previous_len = len(chunk)
+    return spans
+
+
+def split_then_merge(
+    text: str,
+    min_size: int = MIN_CHUNK_SIZE,
+    target_size: int = CHUNK_SIZE,
+    max_size: int = MAX_CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+    language: Optional[Language] = None,
+) -> List[str]:
+    """
+    Split text recursively, then regularize chunk sizes.
+
+    1. Split with the recursive separator cascade at target_size.
+    2. Re-split any chunk longer than max_size with the same cascade.
+    3. Merge neighbours greedily while the merged chunk fits in max_size.
+    4. Fold chunks shorter than min_size into their smaller neighbour.
+
+    Merging works on positions in the original text, so merged chunks keep the
+    exact text (and overlap with the next chunk) that lay between them. Every
+    chunk is at most max_size long, except where step 4 had to fold a fragment
+    into a full neighbour; that chunk can run over by less than min_size.
+
+    Args:
+        text: Text to split
+        min_size: Shortest chunk emitted on its own
+        target_size: chunk_size for the recursive splitter
+        max_size: Longest chunk produced by merging
+        overlap: chunk_overlap for the recursive splitter
+        language: Optional language for code-aware separators
+
+    Returns:
+        List of chunk strings, in text order
+    """
+    splitter = get_splitter(language, target_size, overlap)
+    spans = _split_spans(text, 0, len(text), splitter, overlap)
+    if spans is None:
+        return splitter.split_text(text)
+
+    # Re-split anything the first pass left over max_size
+    bounded = []
+    for start, end in spans:
+        if end - start > max_size:
+            resplit = _split_spans(text, start, end, splitter, overlap)
+            if resplit:
+                bounded.extend(resplit)
+                continue
+        bounded.append((start, end))
+
+    # Merge neighbours while the union of their spans fits in max_size
+    merged = []
+    for start, end in bounded:
+        if merged and max(end, merged[-1][1]) - merged[-1][0] <= max_size:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    # Fold remaining fragments into whichever neighbour is smaller
+    i = 0
+    while len(merged) > 1 and i < len(merged):
+        start, end = merged[i]
+        if end - start >= min_size:
+            i += 1
+            continue
+        previous_len = merged[i - 1][1] - merged[i - 1][0] if i > 0 else None
+        next_len = merged[i + 1][1] - merged[i + 1][0] if i + 1 < len(merged) else None
+        if next_len is None or (previous_len is not None and previous_len <= next_len):
+            merged[i - 1] = (merged[i - 1][0], max(end, merged[i - 1][1]))
+            del merged[i]
+        else:
+            merged[i + 1] = (min(start, merged[i + 1][0]), merged[i + 1][1])
+            del merged[i]
+
+    return [text[start:end] for start, end in merged]
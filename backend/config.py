@@ -14,6 +14,12 @@ ES_PASSWORD = os.getenv("ES_PASSWORD", "changeme")
 # AI API Configurations - OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Local cache directory for derived artifacts (e.g., fixed query embeddings)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "capstone-ai"))
+
+# Maximum embeddings held in memory by CachedEmbedder (LRU; older ones stay on disk)
+EMBEDDING_CACHE_CAPACITY = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "10000"))
+
 # Verification
 if not GITHUB_TOKEN:
     print("Warning: GITHUB_TOKEN not set. GitHub API may be rate limited.")
@@ -0,0 +1,182 @@
+"""
+Persistent embedding cache.
+
+Wraps any LangChain-style embeddings model (embed_documents / embed_query) so each
+distinct text is embedded once. Vectors are keyed by sha256(model + "\\0" + text)
+and stored as float32 bytes in SQLite under CACHE_DIR, so they survive restarts;
+recently used vectors are additionally served from a bounded in-process LRU.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from config import CACHE_DIR, EMBEDDING_CACHE_CAPACITY
+
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+SQLITE_MAX_PARAMS = 500  # Keys per SELECT ... IN (...) lookup
+
+
+def _encode_vector(vector: Iterable[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode_vector(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbedder:
+    """
+    Embeddings model wrapper that only sends cache misses to the wrapped model.
+
+    Stored vectors are float32, the same precision Elasticsearch keeps for
+    dense_vector fields. If the SQLite file cannot be opened the wrapper still
+    works, just without persistence.
+
+    The in-memory tier holds at most `capacity` vectors (~6 KB each at 1536
+    dims) and evicts the least recently used, so long ingests stay flat in
+    memory. `hits` / `misses` count texts served without / with a model call.
+    """
+
+    def __init__(
+        self,
+        inner,
+        model_name: str,
+        path: str = EMBEDDING_CACHE_PATH,
+        capacity: int = EMBEDDING_CACHE_CAPACITY,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[bytes, Tuple[float, ...]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB)"
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Embedding cache unavailable ({e}); embeddings will not persist")
+            self._conn = None
+
+    def __getattr__(self, name):
+        # Expose the wrapped model's other attributes (model, dimensions, ...). Only
+        # reached for missing attributes, so guard "inner" itself: on a half-built
+        # instance (e.g. during unpickling) it would otherwise recurse forever
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def _recall(self, keys: Iterable[bytes]) -> Dict[bytes, Tuple[float, ...]]:
+        """Return the keys held in memory, marking them most recently used."""
+        found = {}
+        with self._memory_lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+        return found
+
+    def _remember(self, items: Iterable[Tuple[bytes, Iterable[float]]]):
+        """Insert vectors into memory, evicting the least recently used past capacity."""
+        if self.capacity <= 0:
+            return
+        with self._memory_lock:
+            for key, vector in items:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    continue
+                if len(self._memory) >= self.capacity:
+                    self._memory.popitem(last=False)
+                self._memory[key] = tuple(vector)
+
+    def _count(self, hits: int, misses: int):
+        with self._memory_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        found = {}
+        if self._conn is None:
+            return found
+        try:
+            with self._db_lock:
+                for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+                    batch = keys[start:start + SQLITE_MAX_PARAMS]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = _decode_vector(blob)
+        except sqlite3.Error as e:
+            print(f"Warning: Embedding cache lookup failed: {e}")
+        return found
+
+    def _store(self, items: Iterable[Tuple[bytes, List[float]]]):
+        if self._conn is None:
+            return
+        try:
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                    [(key, _encode_vector(vector)) for key, vector in items],
+                )
+        except sqlite3.Error as e:
+            print(f"Warning: Embedding cache write failed: {e}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        distinct = list(dict.fromkeys(keys))
+        vectors = self._recall(distinct)
+        stored = self._lookup([key for key in distinct if key not in vectors])
+        vectors.update(stored)
+
+        # Embed each distinct missing text once, then splice results back in order
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            new_vectors = dict(zip(missing, self.inner.embed_documents(list(missing.values()))))
+            self._store(new_vectors.items())
+            vectors.update(new_vectors)
+            stored.update(new_vectors)
+        self._remember(stored.items())
+        self._count(sum(1 for key in keys if key not in missing), len(missing))
+
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._recall([key]).get(key)
+        if vector is None:
+            vector = self._lookup([key]).get(key)
+            if vector is None:
+                vector = self.inner.embed_query(text)
+                self._store([(key, vector)])
+                self._count(0, 1)
+            else:
+                self._count(1, 0)
+            self._remember([(key, vector)])
+        else:
+            self._count(1, 0)
+        return list(vector)
+
+    def close(self):
+        """Close the SQLite connection; the in-memory tier stays usable."""
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
@@ -1,56 +1,261 @@
+import asyncio
+import codecs
+import json
 import os
-from github import Github
-from config import GITHUB_TOKEN
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from io import StringIO
+from urllib.parse import quote
+import requests
+from github import Auth, Github, GithubException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import CACHE_DIR, GITHUB_TOKEN
 
+# Import orjson for fast parsing of large GitHub responses (e.g. recursive trees)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Import aiohttp for the async, rate-limit-aware file fetcher
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+def _json_dumps(data):
+    """Serialize a request body to UTF-8 JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data).encode("utf-8")
+
+GITHUB_POOL_SIZE = 16  # Matches the ingest fetch thread pool with headroom
+GITHUB_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset({"GET", "POST"}),
+)
+
+# Client-side throttle so parallel fetches stay under GitHub's secondary rate limit
+GITHUB_MAX_CONCURRENT_REQUESTS = 4
+GITHUB_RATE_WINDOW_SECONDS = 10.0
+GITHUB_MAX_REQUESTS_PER_WINDOW = 30
+GITHUB_RATE_LIMIT_RETRIES = 3
+GITHUB_MAX_BACKOFF_SECONDS = 60.0
+
+_REQUEST_SLOTS = threading.Semaphore(GITHUB_MAX_CONCURRENT_REQUESTS)
+_REQUEST_TIMES = deque(maxlen=GITHUB_MAX_REQUESTS_PER_WINDOW)
+_REQUEST_TIMES_LOCK = threading.Lock()
+
+@contextmanager
+def rate_limited():
+    """
+    Gate one GitHub API request through the client-side token bucket.
+
+    At most GITHUB_MAX_CONCURRENT_REQUESTS run at once, and no more than
+    GITHUB_MAX_REQUESTS_PER_WINDOW start within any GITHUB_RATE_WINDOW_SECONDS.
+    """
+    with _REQUEST_SLOTS:
+        with _REQUEST_TIMES_LOCK:
+            if len(_REQUEST_TIMES) == _REQUEST_TIMES.maxlen:
+                wait = _REQUEST_TIMES[0] + GITHUB_RATE_WINDOW_SECONDS - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            _REQUEST_TIMES.append(time.monotonic())
+        yield
+
+def _lower_headers(error):
+    return {k.lower(): v for k, v in (getattr(error, "headers", None) or {}).items()}
+
+def _is_rate_limited(error):
+    """
+    Whether a 403/429 is rate limiting (worth retrying) rather than a real denial.
+
+    429 always is. A 403 only counts when it carries Retry-After or an exhausted
+    X-RateLimit-Remaining; bad credentials and missing permissions are 403s too.
+    """
+    if error.status == 429:
+        return True
+    if error.status != 403:
+        return False
+    headers = _lower_headers(error)
+    return "retry-after" in headers or headers.get("x-ratelimit-remaining") == "0"
+
+def _rate_limit_delay(error, attempt):
+    """Seconds to wait after a 403/429, honoring Retry-After / X-RateLimit-Reset."""
+    headers = _lower_headers(error)
+    try:
+        if "retry-after" in headers:
+            return min(float(headers["retry-after"]), GITHUB_MAX_BACKOFF_SECONDS)
+        if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+            delay = float(headers["x-ratelimit-reset"]) - time.time()
+            return min(max(delay, 1.0), GITHUB_MAX_BACKOFF_SECONDS)
+    except ValueError:
+        pass
+    return min(2 ** attempt, GITHUB_MAX_BACKOFF_SECONDS)
+
+def github_call(fn, *args, **kwargs):
+    """
+    Run a PyGithub call under the rate limiter, backing off when rate limited.
+
+    Other errors, including permission 403s (and rate limiting that outlasts the
+    retries), propagate.
+    """
+    for attempt in range(GITHUB_RATE_LIMIT_RETRIES + 1):
+        try:
+            with rate_limited():
+                return fn(*args, **kwargs)
+        except GithubException as e:
+            if not _is_rate_limited(e) or attempt == GITHUB_RATE_LIMIT_RETRIES:
+                raise
+            delay = _rate_limit_delay(e, attempt)
+            print(f"GitHub rate limited (HTTP {e.status}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+@lru_cache(maxsize=1)
+def get_github_client():
+    """
+    Get the shared PyGithub client (created once per process).
+
+    Reusing one client keeps its HTTP connection pool alive, so per-file
+    fetches skip the TCP + TLS handshake with api.github.com.
+    """
+    auth = Auth.Token(GITHUB_TOKEN) if GITHUB_TOKEN else None
+    return Github(auth=auth, retry=GITHUB_RETRY, pool_size=GITHUB_POOL_SIZE)
+
+@lru_cache(maxsize=1)
+def _get_http_session():
+    """Shared keep-alive session for raw GitHub HTTP calls (GraphQL)."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=8, pool_maxsize=GITHUB_POOL_SIZE, max_retries=GITHUB_RETRY
+    ))
+    if GITHUB_TOKEN:
+        session.headers["Authorization"] = f"bearer {GITHUB_TOKEN}"
+    return session
+
+@lru_cache(maxsize=64)
 def _get_repo(owner, repo):
-    """Get repository object using PyGithub."""
-    g = Github(GITHUB_TOKEN if GITHUB_TOKEN else None)
-    return g.get_repo(f"{owner}/{repo}")
+    """Get repository object using PyGithub (cached; one lookup per repo)."""
+    return github_call(get_github_client().get_repo, f"{owner}/{repo}")
+
+# File extensions to skip (binary/image/video files that aren't useful for code search)
+BINARY_EXTENSIONS = (
+    # Images
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.ico', '.svg',
+    '.tiff', '.tif', '.psd', '.ai', '.eps', '.indd',
+    # Videos
+    '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv', '.3gp',
+    # Audio
+    '.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a',
+    # Archives
+    '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz',
+    # Documents (complex binaries)
+    '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx',
+    # Other binaries
+    '.exe', '.dll', '.so', '.dylib', '.app', '.deb', '.rpm',
+    '.iso', '.dmg', '.pkg', '.appimage'
+)
+
+# Common non-code directories, skipped at any depth
+SKIP_DIRS = frozenset({'node_modules', '.git', '__pycache__', '.next', 'build', 'dist', '.venv', 'venv', 'env'})
+
+GITHUB_API_URL = "https://api.github.com"
+# Conditional-GET cache: url -> (ETag, body). 304 replies are free of rate-limit cost.
+GITHUB_ETAG_CACHE_PATH = os.path.join(CACHE_DIR, "github_etag.sqlite3")
+
+def _etag_cache_connect():
+    os.makedirs(os.path.dirname(GITHUB_ETAG_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(GITHUB_ETAG_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS etags (url TEXT PRIMARY KEY, etag TEXT, body BLOB)")
+    return conn
+
+def get_json_with_etag(url):
+    """
+    GET a GitHub API URL, revalidating any cached copy with If-None-Match.
+
+    A 304 reply returns the cached JSON without transferring the body again;
+    a 200 reply refreshes the cache entry.
+    """
+    conn = _etag_cache_connect()
+    try:
+        row = conn.execute("SELECT etag, body FROM etags WHERE url = ?", (url,)).fetchone()
+        headers = {"Accept": "application/vnd.github+json"}
+        if row:
+            headers["If-None-Match"] = row[0]
+
+        with rate_limited():
+            response = _get_http_session().get(url, headers=headers, timeout=60)
+        if response.status_code == 304 and row:
+            return _json_loads(row[1])
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        if etag:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO etags (url, etag, body) VALUES (?, ?, ?)",
+                    (url, etag, response.content),
+                )
+        return _json_loads(response.content)
+    finally:
+        conn.close()
+
+def _is_indexable_path(path):
+    """True for files outside SKIP_DIRS that don't have a binary extension."""
+    *dirs, _ = path.split("/")
+    if any(d in SKIP_DIRS for d in dirs):
+        return False
+    return not path.lower().endswith(BINARY_EXTENSIONS)
 
 def get_repo_files(owner, repo):
     """
-    Get all text/code file paths from a GitHub repository using PyGithub.
+    Get all text/code file paths from a GitHub repository.
 
     Filters out binary files (images, videos, etc.) to avoid processing issues.
-    PyGithub handles rate limiting automatically and is more reliable than raw requests.
+    The whole tree is listed with one recursive git-tree request, revalidated
+    by ETag so unchanged repositories cost a 304. Truncated trees (very large
+    repositories) and failed requests fall back to walking directories with
+    PyGithub.
     """
     repo_obj = _get_repo(owner, repo)
 
-    # Use recursive=True to get all files (including in subdirectories)
-    contents = repo_obj.get_contents("")
-    files = []
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{repo_obj.default_branch}?recursive=1"
+    try:
+        tree = get_json_with_etag(url)
+        if not tree.get("truncated"):
+            return [
+                item["path"] for item in tree.get("tree", [])
+                if item.get("type") == "blob" and _is_indexable_path(item["path"])
+            ]
+        print(f"Tree listing for {owner}/{repo} is truncated; walking directories instead")
+    except (requests.RequestException, ValueError, sqlite3.Error) as e:
+        print(f"Recursive tree listing failed for {owner}/{repo}; walking directories instead: {e}")
 
-    # File extensions to skip (binary/image/video files that aren't useful for code search)
-    BINARY_EXTENSIONS = {
-        # Images
-        '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.ico', '.svg',
-        '.tiff', '.tif', '.psd', '.ai', '.eps', '.indd',
-        # Videos
-        '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv', '.3gp',
-        # Audio
-        '.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a',
-        # Archives
-        '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz',
-        # Documents (complex binaries)
-        '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx',
-        # Other binaries
-        '.exe', '.dll', '.so', '.dylib', '.app', '.deb', '.rpm',
-        '.iso', '.dmg', '.pkg', '.appimage'
-    }
+    contents = github_call(repo_obj.get_contents, "")
+    files = []
 
     def _walk_contents(contents):
         for content in contents:
             if content.type == "file":
-                file_path = content.path.lower()
                 # Skip binary files
-                if not any(file_path.endswith(ext) for ext in BINARY_EXTENSIONS):
+                if not content.path.lower().endswith(BINARY_EXTENSIONS):
                     files.append(content.path)
             elif content.type == "dir":
                 # Skip common non-code directories
-                skip_dirs = {'node_modules', '.git', '__pycache__', '.next', 'build', 'dist', '.venv', 'venv', 'env'}
-                if content.name not in skip_dirs:
+                if content.name not in SKIP_DIRS:
                     try:
-                        dir_contents = repo_obj.get_contents(content.path)
+                        dir_contents = github_call(repo_obj.get_contents, content.path)
                         _walk_contents(dir_contents)
                     except Exception:
                         # Skip directories we can't access (might be binary/symlinks)
@@ -68,7 +273,10 @@ def get_file_content(owner, repo, path):
     repo_obj = _get_repo(owner, repo)
 
     try:
-        content_file = repo_obj.get_contents(path)
+        content_file = github_call(repo_obj.get_contents, path)
+        if content_file.encoding == "none" or (not content_file.content and content_file.size):
+            # Files over 1 MB come back without inline content
+            return download_file_text(owner, repo, path)
         # PyGithub returns content as base64 encoded bytes
         import base64
         decoded_content = base64.b64decode(content_file.content)
@@ -81,3 +289,266 @@ def get_file_content(owner, repo, path):
         return ""
     except Exception as e:
         raise ValueError(f"Could not fetch content for {owner}/{repo}/{path}: {str(e)}")
+
+RAW_DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+def download_file_text(owner, repo, path):
+    """
+    Stream a file's raw bytes and decode them as UTF-8 while they arrive.
+
+    Used for files over 1 MB, which neither the JSON contents API nor GraphQL
+    inline. Blocks are decoded incrementally, so the whole byte payload is never
+    held alongside its base64 or decoded copies.
+    """
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{quote(path)}"
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    text = StringIO()
+    with rate_limited():
+        with _get_http_session().get(
+            url, headers={"Accept": "application/vnd.github.raw"}, stream=True, timeout=60
+        ) as response:
+            response.raise_for_status()
+            for block in response.iter_content(chunk_size=RAW_DOWNLOAD_BLOCK_SIZE):
+                text.write(decoder.decode(block))
+    text.write(decoder.decode(b"", final=True))
+    return text.getvalue()
+
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+GRAPHQL_BATCH_SIZE = 50  # Blob lookups per GraphQL query
+
+def _graphql_blob_texts(owner, repo, paths):
+    """
+    Fetch blob text for up to GRAPHQL_BATCH_SIZE paths in one GraphQL request.
+
+    Returns a dict of path -> text; text is "" for binary blobs and None where
+    GraphQL could not provide all of it (missing path, or a large blob whose
+    text GraphQL truncated).
+    """
+    variables = {"owner": owner, "name": repo}
+    params = ["$owner: String!", "$name: String!"]
+    fields = []
+    for i, path in enumerate(paths):
+        variables[f"e{i}"] = f"HEAD:{path}"
+        params.append(f"$e{i}: String!")
+        fields.append(f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text isBinary isTruncated }} }}")
+    query = (
+        f"query({', '.join(params)}) {{ repository(owner: $owner, name: $name) {{ "
+        f"{' '.join(fields)} }} }}"
+    )
+
+    with rate_limited():
+        response = _get_http_session().post(
+            GITHUB_GRAPHQL_URL,
+            data=_json_dumps({"query": query, "variables": variables}),
+            headers={"Content-Type": "application/json"},
+            timeout=60,
+        )
+    response.raise_for_status()
+    repository = (_json_loads(response.content).get("data") or {}).get("repository")
+    if repository is None:
+        raise ValueError(f"GraphQL returned no repository for {owner}/{repo}")
+
+    texts = {}
+    for i, path in enumerate(paths):
+        blob = repository.get(f"f{i}")
+        if blob and blob.get("isBinary"):
+            texts[path] = ""
+        elif blob and not blob.get("isTruncated"):
+            texts[path] = blob.get("text")
+        else:
+            texts[path] = None  # Partial text would be indexed as if it were the whole file
+    return texts
+
+GRAPHQL_TREE_DEPTH = 4  # Directory levels expanded per GraphQL tree query
+
+def _graphql_tree_fields(depth):
+    """Selection set for a Tree's entries, nesting `depth` levels of subtrees."""
+    if depth == 0:
+        return "entries { path type }"
+    return f"entries {{ path type object {{ ... on Tree {{ {_graphql_tree_fields(depth - 1)} }} }} }}"
+
+def _collect_tree_entries(entries, files, pending):
+    """Add indexable blobs to files; queue subtrees that weren't expanded yet."""
+    for entry in entries:
+        if entry["type"] == "blob":
+            if _is_indexable_path(entry["path"]):
+                files.append(entry["path"])
+        elif entry["type"] == "tree" and entry["path"].rsplit("/", 1)[-1] not in SKIP_DIRS:
+            subtree = entry.get("object")
+            if subtree and "entries" in subtree:
+                _collect_tree_entries(subtree["entries"], files, pending)
+            else:
+                pending.append(entry["path"])
+
+def get_repo_files_graphql(owner, repo):
+    """
+    Get all text/code file paths from a GitHub repository through GraphQL.
+
+    Each query expands GRAPHQL_TREE_DEPTH directory levels at once; directories
+    deeper than that are fetched in follow-up queries, GRAPHQL_BATCH_SIZE
+    subtrees per request. Requires a token (GraphQL has no anonymous access);
+    without one, get_repo_files is used instead.
+    """
+    if not GITHUB_TOKEN:
+        return get_repo_files(owner, repo)
+
+    files = []
+    pending = [""]  # Tree paths still to expand; "" is the repository root
+    while pending:
+        batch, pending = pending[:GRAPHQL_BATCH_SIZE], pending[GRAPHQL_BATCH_SIZE:]
+        variables = {"owner": owner, "name": repo}
+        params = ["$owner: String!", "$name: String!"]
+        fields = []
+        for i, path in enumerate(batch):
+            variables[f"e{i}"] = f"HEAD:{path}"
+            params.append(f"$e{i}: String!")
+            fields.append(
+                f"t{i}: object(expression: $e{i}) {{ ... on Tree {{ {_graphql_tree_fields(GRAPHQL_TREE_DEPTH)} }} }}"
+            )
+        query = (
+            f"query({', '.join(params)}) {{ repository(owner: $owner, name: $name) {{ "
+            f"{' '.join(fields)} }} }}"
+        )
+
+        with rate_limited():
+            response = _get_http_session().post(
+                GITHUB_GRAPHQL_URL,
+                data=_json_dumps({"query": query, "variables": variables}),
+                headers={"Content-Type": "application/json"},
+                timeout=60,
+            )
+        response.raise_for_status()
+        repository = (_json_loads(response.content).get("data") or {}).get("repository")
+        if repository is None:
+            raise ValueError(f"GraphQL returned no repository for {owner}/{repo}")
+
+        for i in range(len(batch)):
+            tree = repository.get(f"t{i}") or {}
+            _collect_tree_entries(tree.get("entries", []), files, pending)
+
+    return files
+
+def get_file_contents(owner, repo, paths):
+    """
+    Get the contents of several files, coalescing requests where possible.
+
+    With a token, paths are fetched GRAPHQL_BATCH_SIZE at a time through the
+    GraphQL API instead of one REST call each. Files GraphQL cannot inline
+    in full (missing or truncated text) are streamed raw; batches that fail fall back to
+    get_file_content. Files that cannot be fetched at all are reported and
+    omitted from the result.
+    """
+    contents = {}
+    pending = list(paths)
+    large = []
+
+    if GITHUB_TOKEN and pending:  # GraphQL requires authentication
+        try:
+            texts = _graphql_blob_texts(owner, repo, pending)
+            contents = {path: text for path, text in texts.items() if text is not None}
+            large = [path for path, text in texts.items() if text is None]
+            pending = []
+        except (requests.RequestException, ValueError) as e:
+            print(f"GraphQL batch fetch failed for {owner}/{repo}; falling back to REST: {e}")
+
+    for path in large:
+        try:
+            contents[path] = download_file_text(owner, repo, path)
+        except requests.RequestException as e:
+            print(f"Error processing {path}: Could not fetch content for {owner}/{repo}/{path}: {str(e)}")
+
+    for path in pending:
+        try:
+            contents[path] = get_file_content(owner, repo, path)
+        except ValueError as e:
+            print(f"Error processing {path}: {str(e)}")
+
+    return contents
+
+ASYNC_FETCH_CONCURRENCY = 10  # Concurrent downloads in flight for aget_file_contents
+RATE_LIMIT_REMAINING_FLOOR = 10  # Pause until the reset once fewer requests than this remain
+
+async def _aget_file_text(session, semaphore, pause, owner, repo, path):
+    """
+    Download one file's raw text, backing off on 403/429 and near-exhausted quotas.
+
+    `pause` is shared by every download in the batch: once any response reports a
+    Retry-After or an almost exhausted quota, all tasks wait until pause["until"].
+    Returns None when the file cannot be fetched.
+    """
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{quote(path)}"
+    async with semaphore:
+        for attempt in range(GITHUB_RATE_LIMIT_RETRIES + 1):
+            wait = pause["until"] - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                async with session.get(url) as response:
+                    if _is_rate_limited(response) and attempt < GITHUB_RATE_LIMIT_RETRIES:
+                        delay = _rate_limit_delay(response, attempt)
+                        print(f"GitHub rate limited (HTTP {response.status}); retrying in {delay:.1f}s")
+                        pause["until"] = max(pause["until"], time.time() + delay)
+                        continue
+                    response.raise_for_status()
+
+                    remaining = response.headers.get("X-RateLimit-Remaining")
+                    reset = response.headers.get("X-RateLimit-Reset")
+                    if remaining and reset and int(remaining) < RATE_LIMIT_REMAINING_FLOOR:
+                        pause["until"] = max(pause["until"], float(reset))
+
+                    body = await response.read()
+                    return body.decode("utf-8", errors="ignore")
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Error processing {path}: Could not fetch content for {owner}/{repo}/{path}: {e}")
+                return None
+    return None
+
+def github_aiohttp_session():
+    """
+    Create an aiohttp session for raw GitHub content downloads.
+
+    Callers own the session (use it as an async context manager); every request
+    made through it reuses the same pooled keep-alive connections.
+    """
+    if not AIOHTTP_AVAILABLE:
+        raise ImportError("aiohttp is required for async GitHub downloads")
+    headers = {"Accept": "application/vnd.github.raw"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"bearer {GITHUB_TOKEN}"
+    return aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=60))
+
+async def aget_file_content(session, owner, repo, path):
+    """
+    Async counterpart of get_file_content on a caller-owned session.
+
+    Pass the same session (from github_aiohttp_session) to every call so downloads
+    share its connections. Backs off on 403/429 like aget_file_contents, but rate
+    limit pauses are not coordinated across separate calls.
+
+    Raises:
+        ValueError: If the file cannot be fetched
+    """
+    text = await _aget_file_text(session, asyncio.Semaphore(1), {"until": 0.0}, owner, repo, path)
+    if text is None:
+        raise ValueError(f"Could not fetch content for {owner}/{repo}/{path}")
+    return text
+
+async def aget_file_contents(owner, repo, paths, concurrency=ASYNC_FETCH_CONCURRENCY):
+    """
+    Async counterpart of get_file_contents for callers already on an event loop.
+
+    Downloads raw file contents concurrently (at most `concurrency` at a time),
+    honoring Retry-After / X-RateLimit-Reset. Files that cannot be fetched are
+    reported and omitted from the result. Without aiohttp, the synchronous
+    get_file_contents runs in a worker thread instead.
+    """
+    if not AIOHTTP_AVAILABLE:
+        return await asyncio.to_thread(get_file_contents, owner, repo, paths)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pause = {"until": 0.0}
+    async with github_aiohttp_session() as session:
+        texts = await asyncio.gather(*(
+            _aget_file_text(session, semaphore, pause, owner, repo, path) for path in paths
+        ))
+    return {path: text for path, text in zip(paths, texts) if text is not None}
@@ -5,10 +5,9 @@ This module handles the ingestion of code from GitHub repositories into Elastics
 including text splitting, embedding generation, and indexing for semantic search.
 """
 
-from github_utils import get_repo_files, get_file_content
+from github_utils import GRAPHQL_BATCH_SIZE, get_repo_files, get_file_content, get_file_contents
 from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_text_splitters import Language
+from chunking import CHUNK_OVERLAP, CHUNK_SIZE, file_extension, get_splitter, splitter_for
 
 try:
     from langchain_text_splitters import MarkdownHeaderTextSplitter
@@ -18,7 +17,9 @@ try:
     from langchain_text_splitters import RecursiveJsonSplitter
 except ImportError:
     RecursiveJsonSplitter = None
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
 from config import ES_HOST, ES_USER, ES_PASSWORD, OPENAI_API_KEY as DEFAULT_OPENAI_API_KEY
 import json
 import hashlib
@@ -26,9 +27,11 @@ import time
 import random
 import tempfile
 import os
+from functools import lru_cache
 from io import StringIO
-from typing import List, Dict, Any, Tuple, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Set, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import get_context
 
 # Import tiktoken for accurate token counting
 try:
@@ -38,11 +41,45 @@ except ImportError:
     TIKTOKEN_AVAILABLE = False
     print("Warning: tiktoken not available, using fallback token estimation")
 
+# Import orjson for fast (C-level) JSON encoding of embedding-heavy request bodies
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Import numpy to send vectors as float32 arrays (orjson encodes them natively)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Import xxhash for fast non-cryptographic chunk IDs (falls back to hashlib.blake2b)
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    XXHASH_AVAILABLE = False
+
 # Configuration for the Elasticsearch index used to store code chunks
 INDEX_NAME = "repo_chunks"  # Name of the Elasticsearch index
+EMBEDDING_MODEL = "text-embedding-ada-002"  # OpenAI embedding model used for chunks and queries
 EMBEDDING_DIM = 1536  # Dimensionality of OpenAI ada-002 embeddings
+EMBEDDING_BATCH_MAX_INPUTS = 2048  # OpenAI's per-request input limit for embeddings
+# Invariant: stored embeddings and query vectors are L2-normalized. OpenAI embeddings
+# already have unit length, so a dot product equals cosine similarity without the
+# per-document magnitude computations; any replacement embeddings model (including
+# test mocks) must normalize its output too. +1.0 keeps scores positive.
+VECTOR_SCORE_SCRIPT = "dotProduct(params.query_vector, 'embedding') + 1.0"
 INDEX_DEFINITION = {
     "mappings": {
+        # Vectors are scored from doc values, so keep them out of _source: the JSON
+        # copy of 1536 floats would otherwise dominate index size and fetch cost
+        "_source": {"excludes": ["embedding"]},
         "properties": {
             "repo_owner": {"type": "keyword"},      # GitHub repository owner
             "repo_name": {"type": "keyword"},       # GitHub repository name
@@ -56,6 +93,27 @@ INDEX_DEFINITION = {
     }
 }
 
+# Splitters are built on first use per language and shared across files/threads
+# (see chunking.get_splitter); from_language() re-resolves separators on every call
+DEFAULT_SPLITTER = get_splitter(None, CHUNK_SIZE, CHUNK_OVERLAP)
+
+# Worker processes for CPU-bound text splitting during ingestion
+SPLIT_WORKERS = os.cpu_count() or 1
+
+# Bulk indexing: worker threads, queued requests per thread pool, and request size caps.
+# queue_size bounds how many serialized bulk bodies wait in memory at once.
+BULK_THREAD_COUNT = min(12, os.cpu_count() or 4)
+BULK_QUEUE_SIZE = 4
+BULK_CHUNK_SIZE = 500
+BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+MGET_BATCH_SIZE = 1000  # Chunk IDs per existence check during incremental ingest
+# Periodic refreshes are paused during bulk loads (one explicit refresh at the end)
+DEFAULT_REFRESH_INTERVAL = "1s"
+
+# Hybrid search: how many hits each rank list contributes, and the RRF rank constant
+RRF_WINDOW_SIZE = 50
+RRF_RANK_CONSTANT = 20
+
 try:
     from langchain_openai import OpenAIEmbeddings
     OPENAI_AVAILABLE = True
@@ -65,19 +123,152 @@ except ImportError:
     OpenAIEmbeddings = None
     print("Warning: OpenAI not available, embeddings will be skipped")
 
+@lru_cache(maxsize=1)
+def _get_token_encoder():
+    """Get the tiktoken encoder for EMBEDDING_MODEL (built once; None if unavailable)."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except Exception as e:
+        print(f"Warning: tiktoken encoder unavailable ({e}), using fallback token estimation")
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with the embedding model's encoder, or estimate conservatively."""
+    encoder = _get_token_encoder()
+    if encoder is not None:
+        # Special-token strings in source code are counted as plain text, not rejected
+        return len(encoder.encode(text, disallowed_special=()))
+    # Fallback to conservative character-based estimation
+    return max(1, len(text) // 3)
+
 def generate_chunk_id(owner: str, repo: str, file_path: str, content: str) -> str:
-    """Generate a unique ID for a code chunk based on repository and content."""
-    unique_string = f"{owner}/{repo}/{file_path}/{content[:100]}"
-    return hashlib.md5(unique_string.encode()).hexdigest()
+    """
+    Generate a deterministic ID for a code chunk from its location and full content.
+
+    The ID doubles as the Elasticsearch _id, so an unchanged chunk maps to the same
+    document on every ingest and can be skipped instead of re-embedded. It is a
+    non-cryptographic 128-bit hash (xxh3_128, or blake2b when xxhash is missing):
+    a dedup key, not an integrity check.
+    """
+    # Feed the parts straight into the hash instead of building and encoding an
+    # intermediate f-string: "owner/repo/path\0content"
+    digest = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=16)
+    digest.update(owner.encode())
+    digest.update(b"/")
+    digest.update(repo.encode())
+    digest.update(b"/")
+    digest.update(file_path.encode())
+    digest.update(b"\0")
+    digest.update(content.encode())
+    return digest.hexdigest()
+
+def as_wire_vector(vector):
+    """
+    Prepare an embedding for an Elasticsearch request body.
 
+    dense_vector stores float32, so the float64 digits Python would serialize
+    are discarded on arrival anyway. With orjson and numpy available the vector
+    is sent as a float32 array, whose shortest round-trip repr is ~half the
+    characters per component; otherwise it is passed through unchanged.
+    """
+    if ORJSON_AVAILABLE and NUMPY_AVAILABLE:
+        return np.asarray(vector, dtype=np.float32)
+    return vector
+
+
+class OrjsonSerializer(JSONSerializer):
+    """
+    Elasticsearch serializer that encodes and decodes bodies with orjson.
+
+    Serializing 1536-float embeddings with the stdlib json module is a hot spot
+    during bulk ingest; orjson does the float formatting in native code. Search
+    and msearch responses are parsed with orjson as well.
+    """
+
+    def loads(self, s):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data):
+        # Strings (e.g. pre-built NDJSON bulk bodies) are passed through as-is
+        if isinstance(data, str):
+            return data
+        try:
+            return orjson.dumps(
+                data, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY
+            ).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError) as e:
+            raise SerializationError(data, e)
+
+@lru_cache(maxsize=1)
 def get_elasticsearch_client():
-    """Get configured Elasticsearch client."""
+    """Get the shared Elasticsearch client (created once per process)."""
+    serializer_kwargs = {"serializer": OrjsonSerializer()} if ORJSON_AVAILABLE else {}
     return Elasticsearch(
         hosts=[ES_HOST],
         basic_auth=(ES_USER, ES_PASSWORD),
-        verify_certs=False
+        verify_certs=False,
+        http_compress=True,  # gzip request bodies; embeddings dominate payload size
+        maxsize=32,          # Connection pool size, sized for concurrent bulk/search requests
+        timeout=60,          # elasticsearch-py 7.x name for the per-request timeout
+        retry_on_timeout=True,
+        max_retries=3,
+        **serializer_kwargs,
     )
 
+@lru_cache(maxsize=8)
+def get_embeddings_model(api_key: str):
+    """Get a shared OpenAI embeddings client for the given API key."""
+    return OpenAIEmbeddings(
+        model=EMBEDDING_MODEL,
+        api_key=api_key,
+        # Send each token-budgeted ingest batch as one request (the client
+        # otherwise re-splits every embed_documents call into 1000-input requests)
+        chunk_size=EMBEDDING_BATCH_MAX_INPUTS,
+    )
+
+class MockEmbeddings:
+    """
+    Offline stand-in for OpenAIEmbeddings, used by the test scripts.
+
+    Each text maps to a deterministic unit-length float32 vector seeded from its
+    hash, so results are reproducible and a query equal to a document embeds to
+    the same vector. Rows are drawn straight into one NumPy array per call.
+    """
+
+    def __init__(self, dims: int = EMBEDDING_DIM):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("MockEmbeddings requires numpy")
+        self.dims = dims
+
+    def _embed(self, texts: List[str]):
+        vectors = np.empty((len(texts), self.dims), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            np.random.default_rng(seed).standard_normal(self.dims, dtype=np.float32, out=vectors[row])
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+@lru_cache(maxsize=1024)
+def _embed_query_cached(text: str, api_key: str, model: str = EMBEDDING_MODEL) -> Tuple[float, ...]:
+    """
+    Embed a search query, memoizing repeated queries to skip the OpenAI round-trip.
+
+    The model name is part of the cache key so switching models never serves stale
+    vectors; a tuple is returned so callers can't mutate the cached value.
+    """
+    return tuple(get_embeddings_model(api_key).embed_query(text))
+
 def ensure_index(es, recreate_if_invalid=False):
     """Ensure the target index exists with the expected mapping."""
     try:
@@ -116,37 +307,39 @@ def ensure_index(es, recreate_if_invalid=False):
         print(f"Warning: Unable to verify Elasticsearch index mapping: {exc}")
         return False
 
-def process_file_chunks(owner: str, repo: str, file_path: str) -> Tuple[str, List[str], List[Dict]]:
+def split_file(args: Tuple[str, str]) -> Tuple[str, List[Tuple[str, Dict]]]:
     """
-    Process a single file into chunks with their metadata.
+    Split one file's content into chunks.
+
+    Top-level and free of client state so it can run in a ProcessPoolExecutor
+    worker; returns plain (text, metadata) tuples rather than Document objects
+    to keep the results cheap to pickle.
+
+    Args:
+        args: Tuple of (file_path, content)
 
     Returns:
-        Tuple of (file_path, chunk_texts, chunk_metadata)
+        Tuple of (file_path, [(chunk_text, chunk_metadata), ...])
     """
+    file_path, content = args
     try:
-        # Retrieve the full content of the current file
-        content = get_file_content(owner, repo, file_path)
-        if not content:  # Skip empty files
-            return file_path, [], []
-
         chunks = []  # Will hold the split document chunks
-        chunk_texts = []
-        chunk_metadata = []
 
         # Split the file content into chunks based on file type for optimal processing
         # Different file types need different chunking strategies to preserve semantic meaning
 
+        ext = file_extension(file_path)
+
         # For Markdown files: Use hierarchical splitting that respects document structure
         # First split on headers (# ## ###) to keep sections together, then by size
-        if file_path.endswith(".md") and MarkdownHeaderTextSplitter is not None:
+        if ext == ".md" and MarkdownHeaderTextSplitter is not None:
             headers_to_split_on = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
             splitter = MarkdownHeaderTextSplitter(headers_to_split_on)
             md_chunks = splitter.split_text(content)  # Creates chunks preserving header hierarchy
-            char_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            chunks = char_splitter.split_documents(md_chunks)  # Further split large sections
+            chunks = DEFAULT_SPLITTER.split_documents(md_chunks)  # Further split large sections
         # For JSON files: Use specialized JSON splitter that preserves object structure
         # Attempts structured splitting first, falls back to text splitting if JSON parsing fails
-        elif file_path.endswith(".json") and RecursiveJsonSplitter is not None:
+        elif ext == ".json" and RecursiveJsonSplitter is not None:
             import json
             try:
                 json_data = json.loads(content)  # Parse as JSON object
@@ -160,84 +353,84 @@ def process_file_chunks(owner: str, repo: str, file_path: str) -> Tuple[str, Lis
                 try:
                     loader = TextLoader(temp_file_path)
                     docs = loader.load()
-                    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-                    chunks = splitter.split_documents(docs)
+                    chunks = DEFAULT_SPLITTER.split_documents(docs)
                 finally:
                     os.unlink(temp_file_path)
         # For JSON files without RecursiveJsonSplitter: Use text-based chunking as fallback
-        elif file_path.endswith(".json") and RecursiveJsonSplitter is None:
+        elif ext == ".json" and RecursiveJsonSplitter is None:
             with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as temp_file:
                 temp_file.write(content)
                 temp_file_path = temp_file.name
             try:
                 loader = TextLoader(temp_file_path)
                 docs = loader.load()
-                splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-                chunks = splitter.split_documents(docs)
+                chunks = DEFAULT_SPLITTER.split_documents(docs)
             finally:
                 os.unlink(temp_file_path)
         else:
             # For programming languages: Use language-aware chunking that respects code structure
             # Looks up file extension to determine language-specific splitting rules
-            ext_language_map = {
-                ".py": Language.PYTHON,
-                ".js": Language.JS,
-                ".ts": Language.TS,
-                ".java": Language.JAVA,
-                ".go": Language.GO,
-                ".cs": Language.CSHARP,
-                ".cpp": Language.CPP,
-                ".c": Language.C,
-                ".php": Language.PHP,
-                ".rb": Language.RUBY,
-                ".rs": Language.RUST,
-                ".scala": Language.SCALA,
-                ".swift": Language.SWIFT,
-                ".sol": Language.SOL,
-                ".kt": Language.KOTLIN,
-                ".lua": Language.LUA,
-                ".pl": Language.PERL,
-                ".hs": Language.HASKELL,
-                ".ps1": Language.POWERSHELL,
-                ".html": Language.HTML,
-                ".tex": Language.LATEX,
-                ".md": Language.MARKDOWN,
-                ".proto": Language.PROTO,
-                ".rst": Language.RST,
-                ".cob": Language.COBOL,
-                ".ex": Language.ELIXIR,
-                ".exs": Language.ELIXIR,
-            }
-            ext = next((e for e in ext_language_map if file_path.endswith(e)), None)
-            if ext:
-                language = ext_language_map[ext]
-                # Use language-specific splitter that respects syntax (e.g., function boundaries, classes)
-                splitter = RecursiveCharacterTextSplitter.from_language(language=language, chunk_size=1000, chunk_overlap=100)
-            else:
-                # Unknown file type: Use generic character-based chunking
-                splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+            # Language-specific splitters respect syntax (e.g., function boundaries, classes);
+            # unknown file types use generic character-based chunking
+            splitter = splitter_for(file_path)
 
             from langchain.schema import Document
             doc = Document(page_content=content, metadata={"source": file_path})
             chunks = splitter.split_documents([doc])  # Standard chunking with 1000 char chunks and 100 char overlap
 
-        # Skip files that didn't produce any chunks (e.g., empty files)
-        if not chunks:
-            return file_path, [], []
+        print(f"Processed {len(chunks)} chunks from {file_path}")
+        return file_path, [(chunk.page_content, chunk.metadata) for chunk in chunks]
 
-        # Collect all chunks with their metadata
-        for chunk in chunks:
-            chunk_texts.append(chunk.page_content)
-            chunk_metadata.append(chunk.metadata)
+    except Exception as e:
+        print(f"Error processing {file_path}: {str(e)}")
+        return file_path, []
 
-        print(f"Processed {len(chunks)} chunks from {file_path}")
-        return file_path, chunk_texts, chunk_metadata
+
+def process_file_chunks(owner: str, repo: str, file_path: str) -> Tuple[str, List[str], List[Dict]]:
+    """
+    Process a single file into chunks with their metadata.
+
+    Returns:
+        Tuple of (file_path, chunk_texts, chunk_metadata)
+    """
+    try:
+        # Retrieve the full content of the current file
+        content = get_file_content(owner, repo, file_path)
+        if not content:  # Skip empty files
+            return file_path, [], []
+
+        _, chunks = split_file((file_path, content))
+        return file_path, [text for text, _ in chunks], [metadata for _, metadata in chunks]
 
     except Exception as e:
         print(f"Error processing {file_path}: {str(e)}")
         return file_path, [], []
 
 
+def _reciprocal_rank_fusion(hit_lists: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Merge ranked hit lists with reciprocal rank fusion (score = sum of 1 / (k + rank)).
+
+    Elasticsearch 7.17 has no native `rank: {rrf: {}}`, so the fusion happens here.
+    The fused score replaces each hit's `_score`.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for hits in hit_lists:
+        for rank, hit in enumerate(hits, start=1):
+            doc_id = hit["_id"]
+            fused.setdefault(doc_id, hit)
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (RRF_RANK_CONSTANT + rank)
+
+    ranked_ids = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    results = []
+    for doc_id in ranked_ids:
+        hit = fused[doc_id]
+        hit["_score"] = scores[doc_id]
+        results.append(hit)
+    return results
+
+
 def search_similar_chunks(
     query: str,
     repo_filter: str = None,
@@ -262,67 +455,76 @@ def search_similar_chunks(
             print(f"Warning: Elasticsearch index '{INDEX_NAME}' not found.")
             return []
 
-        should_clauses: List[Dict[str, Any]] = []
         query_embedding = None
 
         api_key = (openai_api_key or DEFAULT_OPENAI_API_KEY)
 
         if api_key and OPENAI_AVAILABLE:
             if ensure_index(es, recreate_if_invalid=False):
-                embeddings_model = OpenAIEmbeddings(
-                    model="text-embedding-ada-002",
-                    api_key=api_key
-                )
-                query_embedding = embeddings_model.embed_query(query)
-                should_clauses.append({
-                    "script_score": {
-                        "query": {
-                            "bool": {
-                                "filter": [
-                                    {"exists": {"field": "embedding"}}
-                                ]
-                            }
-                        },
-                        "script": {
-                            "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
-                            "params": {"query_vector": query_embedding}
-                        }
-                    }
-                })
+                query_embedding = list(_embed_query_cached(query, api_key))
             else:
                 print("Warning: Dense vector mapping unavailable; using keyword search only.")
         else:
             print("Warning: OpenAI API key not found. Using keyword search only.")
 
-        should_clauses.append({
-            "multi_match": {
-                "query": query,
-                "fields": ["content", "file_path", "repo_name"]
-            }
-        })
+        filters: List[Dict[str, Any]] = []
+        if repo_filter:
+            owner, repo = repo_filter.split("/")
+            filters.extend([
+                {"term": {"repo_owner": owner}},
+                {"term": {"repo_name": repo}}
+            ])
 
-        search_body = {
+        keyword_body = {
             "size": top_k,
             "query": {
                 "bool": {
-                    "should": should_clauses,
-                    "minimum_should_match": 1
+                    "must": [{
+                        "multi_match": {
+                            "query": query,
+                            "fields": ["content", "file_path", "repo_name"]
+                        }
+                    }],
+                    "filter": filters
                 }
             }
         }
 
-        if repo_filter:
-            owner, repo = repo_filter.split("/")
-            search_body["query"]["bool"].setdefault("filter", [])
-            search_body["query"]["bool"]["filter"].extend([
-                {"term": {"repo_owner": owner}},
-                {"term": {"repo_name": repo}}
+        if query_embedding is None:
+            response = es.search(index=INDEX_NAME, body=keyword_body)
+            hits = response["hits"]["hits"]
+        else:
+            # Run the vector and keyword queries as separate rank lists in one
+            # round-trip and fuse them by rank, instead of summing both scores
+            # inside a single bool/should query
+            keyword_body["size"] = RRF_WINDOW_SIZE
+            vector_body = {
+                "size": RRF_WINDOW_SIZE,
+                "query": {
+                    "script_score": {
+                        "query": {
+                            "bool": {
+                                "filter": filters + [{"exists": {"field": "embedding"}}]
+                            }
+                        },
+                        "script": {
+                            "source": VECTOR_SCORE_SCRIPT,
+                            "params": {"query_vector": as_wire_vector(query_embedding)}
+                        }
+                    }
+                }
+            }
+            response = es.msearch(body=[
+                {"index": INDEX_NAME}, vector_body,
+                {"index": INDEX_NAME}, keyword_body,
             ])
-
-        response = es.search(index=INDEX_NAME, body=search_body)
+            hits = _reciprocal_rank_fusion(
+                [item.get("hits", {}).get("hits", []) for item in response["responses"]],
+                top_k,
+            )
 
         results = []
-        for hit in response["hits"]["hits"]:
+        for hit in hits:
             source = hit["_source"]
             results.append({
                 "content": source["content"],
@@ -428,6 +630,77 @@ def delete_repository(owner: str, repo: str):
         return 0
 
 
+def _existing_chunk_ids(es, chunk_ids: List[str]) -> Set[str]:
+    """Return the subset of chunk_ids already indexed (checked in mget batches, no _source)."""
+    existing = set()
+    for start in range(0, len(chunk_ids), MGET_BATCH_SIZE):
+        response = es.mget(
+            index=INDEX_NAME, body={"ids": chunk_ids[start:start + MGET_BATCH_SIZE]}, _source=False
+        )
+        existing.update(doc["_id"] for doc in response["docs"] if doc.get("found"))
+    return existing
+
+def _delete_stale_chunks(es, owner: str, repo: str, keep_ids: Set[str]):
+    """Delete this repository's chunks that are not part of the current ingest."""
+    delete_query = {
+        "query": {
+            "bool": {
+                "filter": [
+                    {"term": {"repo_owner": owner}},
+                    {"term": {"repo_name": repo}}
+                ],
+                "must_not": [{"ids": {"values": list(keep_ids)}}]
+            }
+        }
+    }
+    result = es.delete_by_query(index=INDEX_NAME, body=delete_query, refresh=True)
+    print(f"Removed {result.get('deleted', 0)} stale chunks for {owner}/{repo}")
+
+def _iter_index_actions(
+    owner: str,
+    repo: str,
+    chunk_texts: List[str],
+    chunk_metadata: List[Tuple[str, Dict]],
+    embeddings: List[List[float]],
+    chunk_ids: List[str],
+):
+    """
+    Yield bulk index actions one chunk at a time.
+
+    References to each chunk's text and embedding are dropped from the input lists
+    once the action is handed to the bulk helper, so peak memory stays close to a
+    single bulk request rather than the whole repository.
+    """
+    timestamp = int(time.time())
+
+    for i in range(min(len(chunk_texts), len(embeddings))):
+        chunk_text = chunk_texts[i]
+        file_path, metadata = chunk_metadata[i]
+
+        # Content-addressed _id with op_type create: chunks already in the index
+        # were filtered out before embedding, and any that slip through conflict
+        # instead of being rewritten.
+        yield {
+            "_op_type": "create",
+            "_index": INDEX_NAME,
+            "_id": chunk_ids[i],
+            "_source": {
+                "repo_owner": owner,
+                "repo_name": repo,
+                "file_path": file_path,
+                "content": chunk_text,
+                "metadata": metadata,
+                "embedding": as_wire_vector(embeddings[i]),
+                "chunk_id": chunk_ids[i],
+                "timestamp": timestamp
+            }
+        }
+
+        chunk_texts[i] = None
+        chunk_metadata[i] = None
+        embeddings[i] = None
+
+
 """
 Main ingestion function that processes a GitHub repository into Elasticsearch.
 
@@ -449,23 +722,6 @@ def ingest_github_repo(github_url: str, openai_api_key: Optional[str] = None):
         print(f"Error ensuring Elasticsearch index: {exc}")
         return
 
-    # Remove existing chunks for this repository to avoid duplicates and stale data
-    try:
-        delete_query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"repo_owner": owner}},
-                        {"term": {"repo_name": repo}}
-                    ]
-                }
-            }
-        }
-        es.delete_by_query(index=INDEX_NAME, body=delete_query, refresh=True)
-        print(f"Cleared existing chunks for {owner}/{repo}")
-    except Exception as e:
-        print(f"Warning: Failed to clear existing chunks: {e}")
-
     api_key = openai_api_key or DEFAULT_OPENAI_API_KEY
 
     if not api_key or not OPENAI_AVAILABLE:
@@ -476,10 +732,7 @@ def ingest_github_repo(github_url: str, openai_api_key: Optional[str] = None):
         return
 
     # Initialize the OpenAI embeddings model for generating vector representations
-    embeddings_model = OpenAIEmbeddings(
-        model="text-embedding-ada-002",
-        api_key=api_key
-    )
+    embeddings_model = get_embeddings_model(api_key)
 
     # Fetch all file paths from the GitHub repository
     try:
@@ -489,40 +742,80 @@ def ingest_github_repo(github_url: str, openai_api_key: Optional[str] = None):
         print(f"Error fetching file list: {str(e)}")
         return
 
-    # Parallel Processing: Process multiple files concurrently within GitHub rate limits
-    # Use limited concurrency (3-7 threads) to respect GitHub's API rate limits
+    # Parallel Processing: Fetch files concurrently within GitHub rate limits, then hand
+    # each file to a process pool for splitting. Splitting is pure-Python and CPU-bound,
+    # so threads would serialize on the GIL; processes let it scale with cores.
     all_chunks = []
     all_chunk_metadata = []  # Store (file_path, chunk_metadata) pairs
 
     # Use ThreadPoolExecutor with limited workers to respect GitHub API rate limits
     # Adjust if necessary based on actual rate limit observations
+    # Files are fetched in batches so one GraphQL request covers many files
+    file_batches = [files[i:i + GRAPHQL_BATCH_SIZE] for i in range(0, len(files), GRAPHQL_BATCH_SIZE)]
     repo_worker_min_count = 7
-    max_workers = min(repo_worker_min_count, len(files))
-    print(f"Processing {len(files)} files with {max_workers} parallel threads...")
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all file processing tasks
-        future_to_file = {
-            executor.submit(process_file_chunks, owner, repo, file_path): file_path
-            for file_path in files
+    max_workers = max(1, min(repo_worker_min_count, len(file_batches)))
+    print(f"Processing {len(files)} files in {len(file_batches)} fetch batches with {max_workers} fetch threads and {SPLIT_WORKERS} split processes...")
+
+    # Split workers are spawned, not forked: forking while fetch threads (or the web
+    # server's request threads) hold the rate limiter or connection-pool locks can
+    # leave a child deadlocked on a lock no thread will ever release
+    with ProcessPoolExecutor(max_workers=SPLIT_WORKERS, mp_context=get_context("spawn")) as split_pool, \
+            ThreadPoolExecutor(max_workers=max_workers) as fetch_pool:
+        future_to_batch = {
+            fetch_pool.submit(get_file_contents, owner, repo, batch): batch
+            for batch in file_batches
         }
 
+        # Submit each file for splitting as soon as its batch arrives
+        split_futures = {}
+        for future in as_completed(future_to_batch):
+            try:
+                contents = future.result()
+            except Exception as e:
+                print(f"Error fetching batch starting at {future_to_batch[future][0]}: {str(e)}")
+                continue
+            for file_path, content in contents.items():
+                if content:  # Skip empty files
+                    split_futures[split_pool.submit(split_file, (file_path, content))] = file_path
+
         # Collect results as they complete
-        for future in as_completed(future_to_file):
-            file_path = future_to_file[future]
+        for future in as_completed(split_futures):
+            file_path = split_futures[future]
             try:
-                _, chunk_texts, chunk_metas = future.result()
-                # Collect chunks and their metadata from each completed file
-                for i, chunk_text in enumerate(chunk_texts):
+                _, chunks = future.result()
+                # Collect chunks and their (file_path, metadata) pairs from each completed file
+                for chunk_text, chunk_meta in chunks:
                     all_chunks.append(chunk_text)
-                    # Recreate the (file_path, metadata) tuple format
-                    all_chunk_metadata.append((file_path, chunk_metas[i]))
+                    all_chunk_metadata.append((file_path, chunk_meta))
             except Exception as e:
                 print(f"Error processing {file_path}: {str(e)}")
                 continue
 
     print(f"Total chunks collected from all files: {len(all_chunks)}")
 
+    # Incremental ingest: chunk IDs are content hashes, so chunks already in the index
+    # (unchanged since the last ingest) need neither an embedding call nor a write
+    chunk_ids = [
+        generate_chunk_id(owner, repo, file_path, chunk_text)
+        for chunk_text, (file_path, _) in zip(all_chunks, all_chunk_metadata)
+    ]
+    keep_ids = set(chunk_ids)
+    try:
+        seen_ids = _existing_chunk_ids(es, list(keep_ids))
+    except Exception as e:
+        print(f"Warning: Failed to check for existing chunks; re-embedding all: {e}")
+        seen_ids = set()
+    new_chunks, new_metadata, new_ids = [], [], []
+    for chunk_text, chunk_meta, chunk_id in zip(all_chunks, all_chunk_metadata, chunk_ids):
+        if chunk_id in seen_ids:
+            continue
+        seen_ids.add(chunk_id)  # Identical chunks within this ingest are embedded once
+        new_chunks.append(chunk_text)
+        new_metadata.append(chunk_meta)
+        new_ids.append(chunk_id)
+    print(f"Skipping {len(all_chunks) - len(new_chunks)} chunks that are already indexed")
+    all_chunks, all_chunk_metadata, chunk_ids = new_chunks, new_metadata, new_ids
+
     # Batch Processing: Generate embeddings for all chunks with proper token batching
     # This reduces API calls and respects OpenAI rate limits and token limits
     embeddings = []
@@ -532,18 +825,6 @@ def ingest_github_repo(github_url: str, openai_api_key: Optional[str] = None):
             # Use a more conservative estimate since the simple character-based estimate can be inaccurate
             MAX_TOKENS_PER_REQUEST = 250000  # More conservative: leave 50k tokens buffer
 
-            # Use tiktoken for accurate token counting if available
-            def estimate_tokens(text):
-                if TIKTOKEN_AVAILABLE:
-                    try:
-                        # Use the same encoder that OpenAI uses for text-embedding-ada-002
-                        enc = tiktoken.encoding_for_model("text-embedding-ada-002")
-                        return len(enc.encode(text))
-                    except Exception:
-                        pass
-                # Fallback to conservative character-based estimation
-                return max(1, len(text) // 3)
-
             current_batch = []
             current_batch_tokens = 0
             batch_count = 0
@@ -551,8 +832,11 @@ def ingest_github_repo(github_url: str, openai_api_key: Optional[str] = None):
             for chunk_text in all_chunks:
                 chunk_tokens = estimate_tokens(chunk_text)
 
-                # If adding this chunk would exceed the limit, process current batch first
-                if current_batch_tokens + chunk_tokens > MAX_TOKENS_PER_REQUEST and current_batch:
+                # If adding this chunk would exceed either limit, process current batch first
+                if current_batch and (
+                    current_batch_tokens + chunk_tokens > MAX_TOKENS_PER_REQUEST
+                    or len(current_batch) >= EMBEDDING_BATCH_MAX_INPUTS
+                ):
                     batch_count += 1
                     print(f"Processing batch {batch_count}: {len(current_batch)} chunks ({current_batch_tokens} tokens)...")
                     try:
@@ -592,41 +876,51 @@ def ingest_github_repo(github_url: str, openai_api_key: Optional[str] = None):
             print(f"Error generating embeddings: {str(e)}")
             return
 
-    # Batch indexing with Elasticsearch bulk API
-    bulk_actions = []
-    timestamp = int(time.time())
-
-    for i, (chunk_text, embedding) in enumerate(zip(all_chunks, embeddings)):
-        file_path, metadata = all_chunk_metadata[i]
-
-        doc = {
-            "repo_owner": owner,
-            "repo_name": repo,
-            "file_path": file_path,
-            "content": chunk_text,
-            "metadata": metadata,
-            "embedding": embedding,
-            "chunk_id": generate_chunk_id(owner, repo, file_path, chunk_text),
-            "timestamp": timestamp
-        }
-
-        # Prepare bulk action
-        bulk_actions.extend([
-            {"index": {"_index": INDEX_NAME, "_id": doc["chunk_id"]}},
-            doc
-        ])
-
-    # Execute bulk indexing
-    if bulk_actions:
+    # Batch indexing with Elasticsearch bulk API. Actions are produced lazily so
+    # the full list of documents (each carrying a 1536-float vector) never exists at once,
+    # and several worker threads serialize and send bulk requests concurrently
+    if embeddings:
         try:
-            response = es.bulk(body=bulk_actions, refresh=True)
-            if response.get("errors"):
-                failed_items = [item for item in response["items"] if item["index"]["status"] >= 400]
-                print(f"Bulk indexing completed with {len(failed_items)} failures out of {len(bulk_actions)//2}")
+            es.indices.put_settings(index=INDEX_NAME, body={"index": {"refresh_interval": "-1"}})
+        except Exception as settings_error:
+            print(f"Warning: Failed to pause index refresh: {settings_error}")
+        try:
+            indexed = 0
+            failed = 0
+            for ok, info in helpers.parallel_bulk(
+                es,
+                _iter_index_actions(owner, repo, all_chunks, all_chunk_metadata, embeddings, chunk_ids),
+                thread_count=BULK_THREAD_COUNT,
+                queue_size=BULK_QUEUE_SIZE,
+                chunk_size=BULK_CHUNK_SIZE,
+                max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+                raise_on_error=False,
+            ):
+                if ok:
+                    indexed += 1
+                elif info.get("create", {}).get("status") == 409:
+                    pass  # Already indexed by a concurrent ingest
+                else:
+                    failed += 1
+            if failed:
+                print(f"Bulk indexing completed with {failed} failures out of {indexed + failed}")
             else:
-                print(f"Successfully indexed {len(bulk_actions)//2} chunks via bulk API")
+                print(f"Successfully indexed {indexed} chunks via bulk API")
         except Exception as e:
             print(f"Error during bulk indexing: {str(e)}")
+        finally:
+            try:
+                es.indices.put_settings(
+                    index=INDEX_NAME, body={"index": {"refresh_interval": DEFAULT_REFRESH_INTERVAL}}
+                )
+            except Exception as settings_error:
+                print(f"Warning: Failed to restore index refresh interval: {settings_error}")
+
+    # Remove chunks from files that changed or disappeared since the last ingest
+    try:
+        _delete_stale_chunks(es, owner, repo, keep_ids)
+    except Exception as e:
+        print(f"Warning: Failed to remove stale chunks: {e}")
 
     # Refresh the index to make all newly indexed documents immediately searchable
     try:
@@ -7,25 +7,78 @@ prompt, invokes the LLM, and normalizes the response into a predictable shape.
 
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import json
+import os
 import re
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from io import StringIO
+from typing import Any, Dict, Final, List, Optional, Tuple
 
 from github import UnknownObjectException
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-
-from config import GITHUB_TOKEN
+from langchain_openai import ChatOpenAI
+
+# orjson parses LLM responses in native code; fall back to the stdlib parser
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    TTLCache = None
+    CACHETOOLS_AVAILABLE = False
+    print("Warning: cachetools not available, assessment results will not be cached")
+
+from config import CACHE_DIR, GITHUB_TOKEN
 from github_utils import get_file_content
-from ingest_pipeline import INDEX_NAME, get_elasticsearch_client
+from ingest_pipeline import (
+    EMBEDDING_MODEL,
+    INDEX_NAME,
+    VECTOR_SCORE_SCRIPT,
+    as_wire_vector,
+    get_elasticsearch_client,
+    get_embeddings_model,
+)
 
 # Updated constants for improved retrieval
 MAX_CONTEXT_CHARS = 32000  # Increased from 16000 to allow more context
 MAX_SNIPPET_CHARS = 1500   # Increased from 1200
 MAX_FILE_CHARS = 6000
+DEPENDENCY_FILE_LIMIT = 10  # Dependency files fetched for the snapshot
+DEPENDENCY_CHUNKS_PER_FILE = 2  # So one long lockfile can't take every slot
+DEPENDENCY_CONTEXT_CHARS = MAX_CONTEXT_CHARS // 4  # Budget reserved for dependency snapshots
 DEFAULT_FINDINGS_LIMIT = 6
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# How long a positive index-exists check is trusted before asking Elasticsearch again
+INDEX_EXISTS_TTL_SECONDS = 60.0
+
+# LLM used for assessments, and the exact-match response cache in front of it
+CHAT_MODEL = "gpt-5-nano"
+CHAT_TEMPERATURE = 0.1
+RESPONSE_CACHE_TTL_SECONDS = 15 * 60
+RESPONSE_CACHE_MAX_ENTRIES = 128
+# Parsed responses are also persisted under CACHE_DIR so they survive restarts
+RESPONSE_DISK_CACHE_TTL_SECONDS = 24 * 60 * 60
+RESPONSE_DISK_CACHE_MAX_FILES = 1024  # Oldest files beyond this are pruned on write
+
+# Bounded TTL caches for per-file content and retrieved chunks
+ASSESSMENT_CACHE_MAX_ENTRIES = 256
+ASSESSMENT_CACHE_TTL_SECONDS = 10 * 60
 
 # Adaptive chunk limits based on repo size
+CHUNKS_PER_FILE_ESTIMATE = 8  # Typical chunks per file, used to estimate file count from chunk count
 SMALL_REPO_THRESHOLD = 50   # Files
 MEDIUM_REPO_THRESHOLD = 500
 SMALL_REPO_CHUNK_LIMIT = 100
@@ -56,6 +109,17 @@ CRITICAL_FILE_SUFFIXES = (
     "config.json", "config.yaml", "config.yml", "settings.py",
 )
 
+# Lowercased once so endswith() can take the whole tuple against a lowered path
+_CRITICAL_FILE_SUFFIXES_LOWER = tuple(suffix.lower() for suffix in CRITICAL_FILE_SUFFIXES)
+
+# Dependency manifests/lockfiles whose contents are appended to the context (lowercased basenames)
+DEPENDENCY_FILE_BASENAMES = frozenset({
+    "package.json", "requirements.txt", "pipfile", "pyproject.toml",
+    "yarn.lock", "pnpm-lock.yaml", "cargo.toml", "gemfile", "dockerfile",
+})
+# Lockfiles rank below manifests: they are long and mostly restate the manifest's pins
+DEPENDENCY_LOCKFILE_BASENAMES = frozenset({"yarn.lock", "pnpm-lock.yaml"})
+
 # Security-focused query templates for semantic search
 SECURITY_QUERIES = [
     "authentication authorization login session management security vulnerabilities",
@@ -77,11 +141,204 @@ SECURITY_HEURISTIC_PATTERNS = {
     "network": ["http", "https", "fetch", "axios", "request", "url", "uri", "cors", "tls", "ssl"],
 }
 
+# Cheap keyword signals surfaced to the LLM as heuristic hints
+HINT_KEYWORDS = {
+    "Possible credential": ["secret", "apikey", "token", "password", "aws_access"],
+    "Disabled TLS verification": ["verify=False", "NODE_TLS_REJECT_UNAUTHORIZED"],
+    "Command execution": ["exec(", "subprocess.Popen", "system(", "child_process.exec"],
+    "Weak crypto": ["md5", "sha1", "des", "rc4"],
+    "Dangerous eval": ["eval(", "Function(", "pickle.loads", "yaml.load("],
+}
+
+# One case-insensitive pass over the text instead of a substring scan per needle.
+# Each label is a named group, so a match names its label via lastgroup without a
+# lowered copy of the match or a needle lookup; longest needles first within a group
+_HINT_GROUP_LABELS = {f"hint{i}": label for i, label in enumerate(HINT_KEYWORDS)}
+_HINT_RE = re.compile(
+    "|".join(
+        f"(?P<{group}>"
+        + "|".join(re.escape(needle) for needle in sorted(HINT_KEYWORDS[label], key=len, reverse=True))
+        + ")"
+        for group, label in _HINT_GROUP_LABELS.items()
+    ),
+    re.IGNORECASE,
+)
+
+# LLM response cleanup: the first JSON object in free text
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the latter
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# JSON shape the model is asked to return; parsed back by _parse_response
+_RESPONSE_SCHEMA: Final[str] = """
+{
+  "summary": "<overall risk synopsis>",
+  "findings": [
+    {
+      "severity": "critical|high|medium|low|info",
+      "title": "<short name>",
+      "description": "<what is wrong and why it matters>",
+      "file_path": "<relative path if known>",
+      "line_hints": "<line numbers or patterns if available>",
+      "evidence": "<quote the relevant code or configuration>",
+      "remediation": "<specific fix recommendation>",
+      "category": "<CWE/OWASP label if possible>"
+    }
+  ]
+}
+""".strip()
+
+# Static prompt prefix shared by every assessment (see _build_prompt)
+_INSTRUCTIONS: Final[str] = f"""
+You are an experienced application security engineer reviewing GitHub code.
+Analyze the provided context and return JSON with this shape:
+{_RESPONSE_SCHEMA}
+
+Guidelines:
+- Severity must reflect exploitability and impact.
+- Keep findings list short (max 6) and prioritize unique issues.
+- If no issues are evident, return an empty list with a summary that explains the coverage limits.
+- NEVER include prose outside of the JSON object.
+""".strip()
+
+# Server-side file-type boosts for semantic search (function_score, first match wins):
+# 50% for critical dependency/config files, 30% for high-risk paths
+_FILE_BOOST_FUNCTIONS = [
+    {
+        "filter": {
+            "bool": {
+                "should": [
+                    {"wildcard": {"file_path": {"value": f"*{suffix}", "case_insensitive": True}}}
+                    for suffix in CRITICAL_FILE_SUFFIXES
+                ],
+                "minimum_should_match": 1,
+            }
+        },
+        "weight": 1.5,
+    },
+    {
+        "filter": {
+            "bool": {
+                "should": [
+                    {"wildcard": {"file_path": {"value": f"*{pattern}*", "case_insensitive": True}}}
+                    for pattern in HIGH_RISK_FILE_PATTERNS
+                ],
+                "minimum_should_match": 1,
+            }
+        },
+        "weight": 1.3,
+    },
+]
+
+# Score contribution per heuristic category (counted once per category)
+HEURISTIC_CATEGORY_WEIGHTS = {
+    "dangerous_functions": 0.3,  # Higher weight for critical patterns
+    "secrets": 0.3,
+    "auth": 0.2,
+    "crypto": 0.2,
+}
+DEFAULT_HEURISTIC_WEIGHT = 0.1
+
+# (compiled pattern, weight) per category, resolved once at import. Each pattern is one
+# case-insensitive alternation, so scoring is a single regex scan per category
+_HEURISTIC_SCORERS = tuple(
+    (
+        re.compile("|".join(re.escape(pattern) for pattern in patterns), re.IGNORECASE),
+        HEURISTIC_CATEGORY_WEIGHTS.get(category, DEFAULT_HEURISTIC_WEIGHT),
+    )
+    for category, patterns in SECURITY_HEURISTIC_PATTERNS.items()
+)
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+_INDEX_EXISTS_CACHE: Dict[str, Tuple[float, bool]] = {}
+
+# Security query embeddings: in-process memo backed by a file keyed on model + query text
+_QUERY_EMBEDDINGS: Optional[List[List[float]]] = None
+_QUERY_EMBEDDINGS_KEY = hashlib.sha256(
+    (EMBEDDING_MODEL + "|" + "\n".join(SECURITY_QUERIES)).encode("utf-8")
+).hexdigest()
+_QUERY_EMBEDDINGS_PATH = os.path.join(CACHE_DIR, "query_embeddings", f"{_QUERY_EMBEDDINGS_KEY}.json")
+
+# File contents and retrieved chunks for repeat assessments (UI retries, re-runs)
+if CACHETOOLS_AVAILABLE:
+    _FILE_CONTENT_CACHE = TTLCache(maxsize=ASSESSMENT_CACHE_MAX_ENTRIES, ttl=ASSESSMENT_CACHE_TTL_SECONDS)
+    _CHUNKS_CACHE = TTLCache(maxsize=ASSESSMENT_CACHE_MAX_ENTRIES, ttl=ASSESSMENT_CACHE_TTL_SECONDS)
+else:
+    _FILE_CONTENT_CACHE = None
+    _CHUNKS_CACHE = None
+_ASSESSMENT_CACHE_LOCK = threading.Lock()
+
+
+def _index_exists(es, index: str = INDEX_NAME) -> bool:
+    """
+    Check whether the index exists, remembering a positive answer for a short TTL.
+
+    Only positive results are cached so a freshly ingested repository is visible
+    immediately; a missing index stays a cheap early return.
+    """
+    now = time.monotonic()
+    cached = _INDEX_EXISTS_CACHE.get(index)
+    if cached and now - cached[0] < INDEX_EXISTS_TTL_SECONDS:
+        return cached[1]
+
+    exists = bool(es.indices.exists(index=index))
+    if exists:
+        _INDEX_EXISTS_CACHE[index] = (now, exists)
+    else:
+        _INDEX_EXISTS_CACHE.pop(index, None)
+    return exists
+
+
+def _assessment_cache_get(cache, key):
+    if cache is None:
+        return None
+    with _ASSESSMENT_CACHE_LOCK:
+        return cache.get(key)
+
+
+def _assessment_cache_put(cache, key, value) -> None:
+    if cache is None:
+        return
+    with _ASSESSMENT_CACHE_LOCK:
+        cache[key] = value
+
+
+def invalidate_assessment_cache(owner: Optional[str] = None, repo: Optional[str] = None) -> None:
+    """
+    Drop cached file contents, retrieved chunks and file-count estimates.
+
+    Call after a repository is (re)ingested or deleted. With no arguments every
+    entry is dropped; otherwise only entries for owner/repo.
+    """
+    _estimate_repo_file_count.cache_clear()
+    with _ASSESSMENT_CACHE_LOCK:
+        for cache in (_FILE_CONTENT_CACHE, _CHUNKS_CACHE):
+            if cache is None:
+                continue
+            if owner is None and repo is None:
+                cache.clear()
+                continue
+            for key in [k for k in cache.keys() if k[0] == owner and k[1] == repo]:
+                cache.pop(key, None)
+
+
+def _get_file_content_cached(owner: str, repo: str, file_path: str) -> Optional[str]:
+    key = (owner, repo, file_path)
+    cached = _assessment_cache_get(_FILE_CONTENT_CACHE, key)
+    if cached is not None:
+        return cached
+
+    content = get_file_content(owner, repo, file_path)
+    if content:
+        _assessment_cache_put(_FILE_CONTENT_CACHE, key, content)
+    return content
+
+
 def _ensure_repo_inputs(
     github_url: Optional[str], owner: Optional[str], repo: Optional[str]
 ) -> Tuple[str, str]:
@@ -98,39 +355,43 @@ def _ensure_repo_inputs(
 
 
 def _get_repo_file_count(es, owner: str, repo: str) -> int:
-    """Get approximate count of unique files in a repository."""
+    """Get approximate count of files in a repository."""
     try:
-        if not es.indices.exists(index=INDEX_NAME):
+        if not _index_exists(es):
             return 0
-
-        # Use cardinality aggregation to count unique file paths
-        response = es.search(
-            index=INDEX_NAME,
-            body={
-                "size": 0,
-                "query": {
-                    "bool": {
-                        "filter": [
-                            {"term": {"repo_owner": owner}},
-                            {"term": {"repo_name": repo}},
-                        ]
-                    }
-                },
-                "aggs": {
-                    "unique_files": {
-                        "cardinality": {
-                            "field": "file_path.keyword"
-                        }
-                    }
-                }
-            }
-        )
-        return response.get("aggregations", {}).get("unique_files", {}).get("value", 0)
+        return _estimate_repo_file_count(owner, repo)
     except Exception as e:
         print(f"Warning: Could not get file count: {e}")
         return 0
 
 
+@lru_cache(maxsize=256)
+def _estimate_repo_file_count(owner: str, repo: str) -> int:
+    """
+    Estimate a repository's file count from its chunk count.
+
+    The result only picks one of three chunk limits, so a plain count divided
+    by a typical chunks-per-file ratio is enough; it is memoized per
+    repository (failures raise and are not cached) and cleared by
+    invalidate_assessment_cache.
+    """
+    es = get_elasticsearch_client()
+    response = es.count(
+        index=INDEX_NAME,
+        body={
+            "query": {
+                "bool": {
+                    "filter": [
+                        {"term": {"repo_owner": owner}},
+                        {"term": {"repo_name": repo}},
+                    ]
+                }
+            }
+        }
+    )
+    return response.get("count", 0) // CHUNKS_PER_FILE_ESTIMATE
+
+
 def _calculate_chunk_limit(file_count: int) -> int:
     """Calculate adaptive chunk limit based on repository size."""
     if file_count < SMALL_REPO_THRESHOLD:
@@ -141,63 +402,108 @@ def _calculate_chunk_limit(file_count: int) -> int:
         return LARGE_REPO_CHUNK_LIMIT
 
 
-def _is_high_risk_file(file_path: str) -> bool:
-    """Check if a file path matches high-risk patterns."""
-    file_lower = file_path.lower()
-    return any(pattern in file_lower for pattern in HIGH_RISK_FILE_PATTERNS)
-
-
 def _is_critical_file(file_path: str) -> bool:
     """Check if a file is critical (e.g., dependency or config file)."""
-    file_lower = file_path.lower()
-    return any(file_lower.endswith(suffix) for suffix in CRITICAL_FILE_SUFFIXES)
+    return file_path.lower().endswith(_CRITICAL_FILE_SUFFIXES_LOWER)
 
 
 def _calculate_heuristic_score(content: str) -> float:
     """Calculate a heuristic score based on security-relevant patterns in content."""
-    content_lower = content.lower()
-    score = 0.0
-
-    for category, patterns in SECURITY_HEURISTIC_PATTERNS.items():
-        for pattern in patterns:
-            if pattern.lower() in content_lower:
-                # Weight different categories
-                if category in ["dangerous_functions", "secrets"]:
-                    score += 0.3  # Higher weight for critical patterns
-                elif category in ["auth", "crypto"]:
-                    score += 0.2
-                else:
-                    score += 0.1
-                break  # Only count once per category
+    return sum(weight for regex, weight in _HEURISTIC_SCORERS if regex.search(content))
+
+
+def _read_query_embeddings_cache() -> Optional[List[List[float]]]:
+    try:
+        with open(_QUERY_EMBEDDINGS_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, list) or len(data) != len(SECURITY_QUERIES):
+        return None
+    return data
+
 
-    return score
+def _write_json_atomic(path: str, data: Any) -> None:
+    """Write JSON via a temp file and os.replace so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _write_query_embeddings_cache(embeddings: List[List[float]]) -> None:
+    try:
+        _write_json_atomic(_QUERY_EMBEDDINGS_PATH, embeddings)
+    except OSError as e:
+        print(f"Warning: Could not write query embedding cache: {e}")
 
 
 def _generate_security_query_embeddings(api_key: str) -> List[List[float]]:
-    """Generate embeddings for all security-focused queries."""
+    """
+    Generate embeddings for all security-focused queries.
+
+    SECURITY_QUERIES is constant, so the vectors are memoized in-process and
+    persisted under CACHE_DIR keyed by a hash of the model and query text;
+    only the first run (or a change to either) calls the embeddings API.
+    """
+    global _QUERY_EMBEDDINGS
+    if _QUERY_EMBEDDINGS is not None:
+        return _QUERY_EMBEDDINGS
+
+    cached = _read_query_embeddings_cache()
+    if cached is not None:
+        _QUERY_EMBEDDINGS = cached
+        return cached
+
     try:
-        embeddings_model = OpenAIEmbeddings(
-            model="text-embedding-ada-002",
-            api_key=api_key
-        )
-        return [embeddings_model.embed_query(query) for query in SECURITY_QUERIES]
+        embeddings_model = get_embeddings_model(api_key)
+        # One batched request for all queries instead of a round trip per query
+        embeddings = embeddings_model.embed_documents(list(SECURITY_QUERIES))
     except Exception as e:
         print(f"Warning: Could not generate security query embeddings: {e}")
         return []
 
+    _write_query_embeddings_cache(embeddings)
+    _QUERY_EMBEDDINGS = embeddings
+    return embeddings
 
-def _semantic_search_chunks(
-    es,
+
+def _chunk_from_hit(hit: Dict[str, Any], score: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Normalize a search hit into a chunk dict with every field present.
+
+    Defaults are filled in once here so downstream code can index fields
+    directly instead of repeating `.get(...) or default` per access.
+    """
+    # The hit's _source is owned by this response, so fill it in place rather
+    # than copying every field into a new dict
+    chunk = hit.get("_source")
+    if chunk is None:
+        chunk = {}
+    if not chunk.get("file_path"):
+        chunk["file_path"] = "unknown"
+    if not chunk.get("content"):
+        chunk["content"] = ""
+    if not chunk.get("repo_owner"):
+        chunk["repo_owner"] = ""
+    if not chunk.get("repo_name"):
+        chunk["repo_name"] = ""
+    if not chunk.get("metadata"):
+        chunk["metadata"] = {}
+    if score is not None:
+        chunk["_score"] = score
+    return chunk
+
+
+def _semantic_search_body(
     owner: str,
     repo: str,
     query_embedding: List[float],
     limit: int,
     file_path: Optional[str] = None
-) -> List[Dict[str, Any]]:
-    """
-    Perform semantic search for chunks using cosine similarity.
-    Returns chunks with their scores.
-    """
+) -> Dict[str, Any]:
+    """Build the vector-similarity search body shared by single and batched searches."""
     filters = [
         {"term": {"repo_owner": owner}},
         {"term": {"repo_name": repo}},
@@ -207,19 +513,29 @@ def _semantic_search_chunks(
     if file_path:
         filters.append({"term": {"file_path": file_path}})
 
-    query = {
+    return {
         "size": limit,
+        "track_total_hits": False,  # Only hits are used; skip exact hit counting
         "query": {
-            "script_score": {
+            # File-type boosts are applied by Elasticsearch so the top hits returned
+            # are already ranked with them, instead of re-ranking a larger pull locally
+            "function_score": {
                 "query": {
-                    "bool": {
-                        "filter": filters
+                    "script_score": {
+                        "query": {
+                            "bool": {
+                                "filter": filters
+                            }
+                        },
+                        "script": {
+                            "source": VECTOR_SCORE_SCRIPT,
+                            "params": {"query_vector": as_wire_vector(query_embedding)}
+                        }
                     }
                 },
-                "script": {
-                    "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
-                    "params": {"query_vector": query_embedding}
-                }
+                "functions": _FILE_BOOST_FUNCTIONS,
+                "score_mode": "first",  # Critical-file boost takes precedence over high-risk
+                "boost_mode": "multiply",
             }
         },
         "_source": {
@@ -227,82 +543,141 @@ def _semantic_search_chunks(
         }
     }
 
+
+def _semantic_search_chunks(
+    es,
+    owner: str,
+    repo: str,
+    query_embedding: List[float],
+    limit: int,
+    file_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Perform semantic search for chunks by vector similarity.
+    Returns chunks with their scores.
+    """
+    query = _semantic_search_body(owner, repo, query_embedding, limit, file_path)
+
     try:
         response = es.search(index=INDEX_NAME, body=query)
         hits = response.get("hits", {}).get("hits", [])
-        return [
-            {
-                **hit.get("_source", {}),
-                "_score": hit.get("_score", 0.0)
-            }
-            for hit in hits
-        ]
+        return [_chunk_from_hit(hit, hit.get("_score") or 0.0) for hit in hits]
     except Exception as e:
         print(f"Warning: Semantic search failed: {e}")
         return []
 
 
-def _merge_and_deduplicate_chunks(chunk_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+def _semantic_search_chunks_batch(
+    es,
+    owner: str,
+    repo: str,
+    query_embeddings: List[List[float]],
+    limit: int,
+) -> List[List[Dict[str, Any]]]:
     """
-    Merge multiple lists of chunks, deduplicate by content hash, and sort by score.
+    Run one semantic search per query embedding in a single msearch round trip.
+
+    Returns one chunk list per embedding, in order; a failed sub-search (or a
+    failed request) yields empty lists rather than aborting the assessment.
     """
-    seen_content = set()
-    merged = []
+    body: List[Dict[str, Any]] = []
+    for query_embedding in query_embeddings:
+        body.append({"index": INDEX_NAME})
+        body.append(_semantic_search_body(owner, repo, query_embedding, limit))
 
-    for chunk_list in chunk_lists:
-        for chunk in chunk_list:
-            content = chunk.get("content", "")
-            # Simple deduplication using content hash
-            content_hash = hash(content)
+    try:
+        responses = es.msearch(body=body).get("responses", [])
+    except Exception as e:
+        print(f"Warning: Semantic search failed: {e}")
+        return [[] for _ in query_embeddings]
 
-            if content_hash not in seen_content:
-                seen_content.add(content_hash)
-                merged.append(chunk)
+    chunk_lists: List[List[Dict[str, Any]]] = []
+    for sub_response in responses:
+        if "error" in sub_response:
+            print(f"Warning: Semantic search failed: {sub_response['error']}")
+            chunk_lists.append([])
+            continue
+        hits = sub_response.get("hits", {}).get("hits", [])
+        chunk_lists.append([_chunk_from_hit(hit, hit.get("_score") or 0.0) for hit in hits])
+    return chunk_lists
 
-    # Sort by score (highest first)
-    merged.sort(key=lambda x: x.get("_score", 0.0), reverse=True)
-    return merged
 
+def _content_digest(chunk: Dict[str, Any]) -> bytes:
+    """
+    Stable digest of a chunk's content, computed once and memoized on the chunk.
 
-def _apply_boosting(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    Unlike hash(), the value is not salted per process, and later stages can
+    reuse it without rehashing the content.
     """
-    Apply file-type and heuristic boosting to chunk scores.
+    digest = chunk.get("_digest")
+    if digest is None:
+        digest = hashlib.blake2b(chunk["content"].encode("utf-8", "ignore"), digest_size=16).digest()
+        chunk["_digest"] = digest
+    return digest
+
+
+def _boost_multiplier(chunk: Dict[str, Any]) -> float:
     """
-    for chunk in chunks:
-        file_path = chunk.get("file_path", "")
-        content = chunk.get("content", "")
-        base_score = chunk.get("_score", 1.0)
+    Heuristic content boost applied to a chunk's score.
 
-        boost_multiplier = 1.0
+    File-type boosts are already part of the score returned by the semantic
+    search (see _FILE_BOOST_FUNCTIONS); only content heuristics need the text.
+    """
+    return 1.0 + _calculate_heuristic_score(chunk["content"])
 
-        # File-type boost
-        if _is_critical_file(file_path):
-            boost_multiplier += 0.5  # 50% boost for critical files
-        elif _is_high_risk_file(file_path):
-            boost_multiplier += 0.3  # 30% boost for high-risk files
 
-        # Heuristic pattern boost
-        heuristic_score = _calculate_heuristic_score(content)
-        boost_multiplier += heuristic_score
+def _merge_boost_diversify(
+    chunk_lists: List[List[Dict[str, Any]]],
+    max_per_file: int = 5,
+    top_k: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Merge per-query results, deduplicate by content, boost, and enforce per-file diversity.
 
-        chunk["_score"] = base_score * boost_multiplier
-        chunk["_boost_applied"] = boost_multiplier
+    Boosting happens while merging, so each unique chunk is scored exactly once
+    and the list is sorted once; the diversity pass stops as soon as top_k
+    chunks have been selected.
+    """
+    seen_content = set()
+    merged = []
 
-    # Re-sort after boosting
-    chunks.sort(key=lambda x: x.get("_score", 0.0), reverse=True)
-    return chunks
+    for chunk_list in chunk_lists:
+        for chunk in chunk_list:
+            content_hash = _content_digest(chunk)
+            if content_hash in seen_content:
+                continue
+            seen_content.add(content_hash)
 
+            boost_multiplier = _boost_multiplier(chunk)
+            chunk["_similarity"] = chunk["_score"]
+            chunk["_score"] = chunk["_score"] * boost_multiplier
+            chunk["_boost_applied"] = boost_multiplier
+            merged.append(chunk)
 
-def _ensure_diversity(chunks: List[Dict[str, Any]], max_per_file: int = 5) -> List[Dict[str, Any]]:
+    # Highest boosted score first; raw similarity breaks ties
+    merged.sort(key=lambda x: (x["_score"], x["_similarity"]), reverse=True)
+
+    return _ensure_diversity(merged, max_per_file=max_per_file, max_total=top_k)
+
+
+def _ensure_diversity(
+    chunks: List[Dict[str, Any]],
+    max_per_file: int = 5,
+    max_total: Optional[int] = None,
+) -> List[Dict[str, Any]]:
     """
     Ensure diversity by limiting chunks per file.
     This prevents over-representation of any single file.
+
+    Stops as soon as max_total chunks have been selected, when given.
     """
     file_counts = {}
     diverse_chunks = []
 
     for chunk in chunks:
-        file_path = chunk.get("file_path", "")
+        if max_total is not None and len(diverse_chunks) >= max_total:
+            break
+        file_path = chunk["file_path"]
         count = file_counts.get(file_path, 0)
 
         # Always include critical files even if over limit
@@ -322,42 +697,53 @@ def _force_include_critical_files(
     """
     Force-include critical files (dependencies, configs) if not already present.
     """
-    existing_paths = {chunk.get("file_path") for chunk in existing_chunks}
+    existing_paths = {chunk["file_path"] for chunk in existing_chunks}
     critical_chunks = []
 
+    # One size-1 sub-search per critical suffix, all in a single msearch round
+    # trip, so a suffix with many matching files can't take every slot; files
+    # already selected are excluded server-side
+    body: List[Dict[str, Any]] = []
     for suffix in CRITICAL_FILE_SUFFIXES:
-        # Search for files ending with this suffix
-        query = {
-            "size": 1,  # Just get one chunk from each critical file
+        body.append({"index": INDEX_NAME})
+        body.append({
+            "size": 1,
+            "track_total_hits": False,
             "query": {
                 "bool": {
                     "filter": [
                         {"term": {"repo_owner": owner}},
                         {"term": {"repo_name": repo}},
-                        {"wildcard": {"file_path": f"*{suffix}"}}
-                    ]
+                        {"wildcard": {"file_path": {"value": f"*{suffix}", "case_insensitive": True}}},
+                    ],
+                    "must_not": [
+                        {"terms": {"file_path": sorted(existing_paths)}}
+                    ],
                 }
             },
+            "sort": [{"file_path": "asc"}],
             "_source": {
                 "includes": ["file_path", "content", "repo_owner", "repo_name", "metadata"]
             }
-        }
+        })
 
-        try:
-            response = es.search(index=INDEX_NAME, body=query)
-            hits = response.get("hits", {}).get("hits", [])
-
-            for hit in hits:
-                file_path = hit["_source"].get("file_path")
-                if file_path not in existing_paths:
-                    chunk = hit["_source"]
-                    chunk["_score"] = 999.0  # High score to ensure inclusion
-                    chunk["_critical"] = True
-                    critical_chunks.append(chunk)
-                    existing_paths.add(file_path)
-        except Exception as e:
-            print(f"Warning: Could not fetch critical file {suffix}: {e}")
+    try:
+        responses = es.msearch(body=body).get("responses", [])
+    except Exception as e:
+        print(f"Warning: Could not fetch critical files: {e}")
+        return critical_chunks
+
+    for suffix, sub_response in zip(CRITICAL_FILE_SUFFIXES, responses):
+        if "error" in sub_response:
+            print(f"Warning: Could not fetch critical files matching {suffix}: {sub_response['error']}")
             continue
+        for hit in sub_response.get("hits", {}).get("hits", []):
+            chunk = _chunk_from_hit(hit, 999.0)  # High score to ensure inclusion
+            file_path = chunk["file_path"]
+            if file_path not in existing_paths:
+                chunk["_critical"] = True
+                critical_chunks.append(chunk)
+                existing_paths.add(file_path)
 
     return critical_chunks
 
@@ -367,6 +753,30 @@ def _fetch_chunks(
     repo: str,
     file_path: Optional[str] = None,
     api_key: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Chunk retrieval with a short-lived cache in front of _retrieve_chunks.
+
+    Results are keyed by (owner, repo, file_path, whether an API key was given),
+    since the key only selects semantic vs. fallback retrieval. Empty results are
+    not cached so a repository ingested moments later is picked up.
+    """
+    key = (owner, repo, file_path, bool(api_key))
+    cached = _assessment_cache_get(_CHUNKS_CACHE, key)
+    if cached is not None:
+        return list(cached)
+
+    chunks = _retrieve_chunks(owner, repo, file_path=file_path, api_key=api_key)
+    if chunks:
+        _assessment_cache_put(_CHUNKS_CACHE, key, list(chunks))
+    return chunks
+
+
+def _retrieve_chunks(
+    owner: str,
+    repo: str,
+    file_path: Optional[str] = None,
+    api_key: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Improved chunk retrieval using multi-stage semantic search with boosting.
@@ -388,7 +798,7 @@ def _fetch_chunks(
         List of chunks sorted by relevance
     """
     es = get_elasticsearch_client()
-    if not es.indices.exists(index=INDEX_NAME):
+    if not _index_exists(es):
         return []
 
     # For file-specific assessments, use simpler retrieval
@@ -411,28 +821,18 @@ def _fetch_chunks(
             print(f"Repository has ~{file_count} files, using chunk limit: {chunk_limit}")
             print(f"Running {len(SECURITY_QUERIES)} semantic searches...")
 
-            # Run semantic search for each security query
-            chunk_lists = []
-            for i, query_embedding in enumerate(query_embeddings):
-                chunks = _semantic_search_chunks(
-                    es, owner, repo, query_embedding, per_query_limit
-                )
-                chunk_lists.append(chunks)
+            # Run semantic search for every security query in one msearch request
+            chunk_lists = _semantic_search_chunks_batch(
+                es, owner, repo, query_embeddings, per_query_limit
+            )
+            for i, chunks in enumerate(chunk_lists):
                 print(f"  Query {i+1}/{len(query_embeddings)}: found {len(chunks)} chunks")
 
-            # Stage 2: Merge and deduplicate
-            print("Merging and deduplicating results...")
-            all_chunks = _merge_and_deduplicate_chunks(chunk_lists)
-            print(f"After deduplication: {len(all_chunks)} unique chunks")
-
-            # Stage 3: Apply file-type and heuristic boosting
-            print("Applying security-focused boosting...")
-            all_chunks = _apply_boosting(all_chunks)
-
-            # Stage 4: Ensure diversity (limit chunks per file)
-            print("Ensuring diversity across files...")
-            all_chunks = _ensure_diversity(all_chunks, max_per_file=5)
-            print(f"After diversity filtering: {len(all_chunks)} chunks")
+            # Stages 2-4: Merge and deduplicate, apply file-type and heuristic boosting,
+            # and ensure diversity (limit chunks per file) in a single pass
+            print("Merging, boosting and diversifying results...")
+            all_chunks = _merge_boost_diversify(chunk_lists, max_per_file=5, top_k=chunk_limit)
+            print(f"After deduplication and diversity filtering: {len(all_chunks)} chunks")
 
             # Stage 5: Force-include critical files
             print("Force-including critical configuration files...")
@@ -455,11 +855,61 @@ def _fetch_chunks(
     for chunk in all_chunks:
         chunk.pop("_score", None)
         chunk.pop("_boost_applied", None)
+        chunk.pop("_similarity", None)
         chunk.pop("_critical", None)
+        chunk.pop("_digest", None)
 
     return all_chunks
 
 
+def _fetch_chunks_for_files(
+    es,
+    owner: str,
+    repo: str,
+    file_paths: List[str],
+    size: int = 10,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch chunks for several files in a single msearch round trip.
+
+    Returns a mapping of file path to its chunks; a file whose sub-search
+    failed maps to an empty list.
+    """
+    if not file_paths:
+        return {}
+
+    body: List[Dict[str, Any]] = []
+    for path in file_paths:
+        body.append({"index": INDEX_NAME})
+        body.append({
+            "size": size,
+            "track_total_hits": False,
+            "query": {
+                "bool": {
+                    "filter": [
+                        {"term": {"repo_owner": owner}},
+                        {"term": {"repo_name": repo}},
+                        {"term": {"file_path": path}},
+                    ]
+                }
+            },
+            "_source": {
+                "includes": ["file_path", "content", "repo_owner", "repo_name", "metadata"]
+            }
+        })
+
+    response = es.msearch(body=body)
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for path, sub_response in zip(file_paths, response.get("responses", [])):
+        if "error" in sub_response:
+            print(f"Warning: Chunk lookup failed for {path}: {sub_response['error']}")
+            results[path] = []
+            continue
+        hits = sub_response.get("hits", {}).get("hits", [])
+        results[path] = [_chunk_from_hit(hit) for hit in hits]
+    return results
+
+
 def _fetch_chunks_for_file(
     es,
     owner: str,
@@ -467,25 +917,7 @@ def _fetch_chunks_for_file(
     file_path: str
 ) -> List[Dict[str, Any]]:
     """Simple retrieval for file-specific assessments."""
-    query = {
-        "size": 10,
-        "query": {
-            "bool": {
-                "filter": [
-                    {"term": {"repo_owner": owner}},
-                    {"term": {"repo_name": repo}},
-                    {"term": {"file_path": file_path}},
-                ]
-            }
-        },
-        "_source": {
-            "includes": ["file_path", "content", "repo_owner", "repo_name", "metadata"]
-        }
-    }
-
-    response = es.search(index=INDEX_NAME, body=query)
-    hits = response.get("hits", {}).get("hits", [])
-    return [hit.get("_source", {}) for hit in hits]
+    return _fetch_chunks_for_files(es, owner, repo, [file_path]).get(file_path, [])
 
 
 def _fallback_fetch_chunks(es, owner: str, repo: str, limit: int = 50) -> List[Dict[str, Any]]:
@@ -514,6 +946,7 @@ def _fallback_fetch_chunks(es, owner: str, repo: str, limit: int = 50) -> List[D
 
     query = {
         "size": limit,
+        "track_total_hits": False,
         "query": {
             "bool": {
                 "filter": [
@@ -531,73 +964,155 @@ def _fallback_fetch_chunks(es, owner: str, repo: str, limit: int = 50) -> List[D
 
     response = es.search(index=INDEX_NAME, body=query)
     hits = response.get("hits", {}).get("hits", [])
-    chunks = [hit.get("_source", {}) for hit in hits]
-
     # Still apply heuristic boosting and diversity
-    for chunk in chunks:
-        chunk["_score"] = 1.0 + _calculate_heuristic_score(chunk.get("content", ""))
+    chunks = [
+        _chunk_from_hit(hit, 1.0 + _calculate_heuristic_score((hit.get("_source") or {}).get("content") or ""))
+        for hit in hits
+    ]
 
-    chunks.sort(key=lambda x: x.get("_score", 0.0), reverse=True)
-    chunks = _ensure_diversity(chunks, max_per_file=5)
+    chunks.sort(key=lambda x: x["_score"], reverse=True)
+    return _ensure_diversity(chunks, max_per_file=5, max_total=limit)
+
+
+def _fetch_dependency_chunks(
+    owner: str,
+    repo: str,
+    file_limit: int = DEPENDENCY_FILE_LIMIT,
+    chunks_per_file: int = DEPENDENCY_CHUNKS_PER_FILE,
+) -> List[Dict[str, Any]]:
+    """
+    Targeted lookup of dependency manifest chunks for the dependency snapshot.
 
-    return chunks[:limit]
+    Matches exact file names (at the repo root or in any directory), so the
+    general relevance-ranked retrieval no longer has to happen to surface these
+    files for them to reach the prompt. Results are collapsed per file and
+    capped at chunks_per_file each; manifests rank ahead of lockfiles.
+    """
+    es = get_elasticsearch_client()
+    if not _index_exists(es):
+        return []
+
+    name_clauses = []
+    for name in sorted(DEPENDENCY_FILE_BASENAMES):
+        boost = 1.0 if name in DEPENDENCY_LOCKFILE_BASENAMES else 2.0
+        for clause in (
+            {"term": {"file_path": {"value": name, "case_insensitive": True}}},
+            {"wildcard": {"file_path": {"value": f"*/{name}", "case_insensitive": True}}},
+        ):
+            name_clauses.append({"constant_score": {"filter": clause, "boost": boost}})
+
+    source = {"includes": ["file_path", "content"]}
+    query = {
+        "size": file_limit,
+        "track_total_hits": False,
+        "query": {
+            "bool": {
+                "filter": [
+                    {"term": {"repo_owner": owner}},
+                    {"term": {"repo_name": repo}},
+                ],
+                "should": name_clauses,
+                "minimum_should_match": 1,
+            }
+        },
+        "sort": ["_score", {"file_path": "asc"}],
+        "collapse": {
+            "field": "file_path",
+            "inner_hits": {"name": "chunks", "size": chunks_per_file, "_source": source},
+        },
+        "_source": source,
+    }
+
+    try:
+        response = es.search(index=INDEX_NAME, body=query)
+    except Exception as e:
+        print(f"Warning: Dependency file lookup failed: {e}")
+        return []
+
+    chunks = []
+    for hit in response.get("hits", {}).get("hits", []):
+        file_hits = hit.get("inner_hits", {}).get("chunks", {}).get("hits", {}).get("hits") or [hit]
+        chunks.extend(_chunk_from_hit(file_hit) for file_hit in file_hits)
+    return chunks
 
 
 def _limit_text(value: str, limit: int) -> str:
     if len(value) <= limit:
         return value
-    return value[:limit] + "\n... [truncated]"
+    return f"{value[:limit]}\n... [truncated]"
+
+
+def _chunk_snippet(chunk: Dict[str, Any]) -> str:
+    """
+    Stripped, length-limited content of a chunk, memoized on the chunk.
+
+    File-level assessments feed the same chunks to both the context and the
+    dependency snapshot, so each is trimmed and truncated only once.
+    """
+    snippet = chunk.get("_snippet")
+    if snippet is None:
+        snippet = _limit_text(chunk["content"].strip(), MAX_SNIPPET_CHARS)
+        chunk["_snippet"] = snippet
+    return snippet
 
 
 def _collect_dependency_snippets(chunks: List[Dict[str, Any]]) -> List[str]:
-    dependency_suffixes = (
-        "package.json",
-        "requirements.txt",
-        "Pipfile",
-        "pyproject.toml",
-        "yarn.lock",
-        "pnpm-lock.yaml",
-        "Cargo.toml",
-        "Gemfile",
-        "Dockerfile",
-    )
     snippets: List[str] = []
     for chunk in chunks:
-        path = (chunk.get("file_path") or "").lower()
-        if any(path.endswith(suffix) for suffix in dependency_suffixes):
-            snippet = chunk.get("content") or ""
+        path = chunk["file_path"]
+        if path.rsplit("/", 1)[-1].lower() in DEPENDENCY_FILE_BASENAMES:
+            snippet = _chunk_snippet(chunk)
             if snippet:
-                snippets.append(
-                    f"Dependency file: {chunk.get('file_path')}\n{_limit_text(snippet.strip(), MAX_SNIPPET_CHARS)}"
-                )
+                snippets.append(f"Dependency file: {path}\n{snippet}")
     return snippets
 
 
-def _format_context(owner: str, repo: str, chunks: List[Dict[str, Any]]) -> Tuple[str, List[str]]:
+def _format_context(
+    owner: str,
+    repo: str,
+    chunks: List[Dict[str, Any]],
+    dependency_chunks: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[str, List[str]]:
+    # Dependency snapshots come from a targeted lookup when the caller has one,
+    # otherwise from whatever manifests happen to be among the general chunks
+    if dependency_chunks is None:
+        dependency_chunks = chunks
+
     if not chunks:
         return "No indexed chunks were found for this repository.", []
 
-    context_lines: List[str] = []
+    # Entries are streamed into one growable buffer; tell() is the running
+    # length of the joined context, so no intermediate joins are needed
+    buf = StringIO()
     sampled_files: List[str] = []
 
+    # Dependency snapshots go first, within their own reserved budget, so the
+    # general snippets (which easily fill MAX_CONTEXT_CHARS) cannot crowd them out
+    dependency_bits = _collect_dependency_snippets(dependency_chunks)
+    if dependency_bits:
+        buf.write("Dependency snapshots:\n")
+        buf.write(_limit_text("\n\n".join(dependency_bits), DEPENDENCY_CONTEXT_CHARS))
+
     for chunk in chunks:
-        file_path = chunk.get("file_path") or "unknown"
+        file_path = chunk["file_path"]
         sampled_files.append(file_path)
-        snippet = (chunk.get("content") or "").strip()
+        snippet = _chunk_snippet(chunk)
         if not snippet:
             continue
-        context_lines.append(
-            f"File: {file_path}\nSnippet:\n{_limit_text(snippet, MAX_SNIPPET_CHARS)}"
-        )
-        if len("".join(context_lines)) > MAX_CONTEXT_CHARS:
+        if buf.tell():
+            buf.write(CONTEXT_SEPARATOR)
+        buf.write("File: ")
+        buf.write(file_path)
+        buf.write("\nSnippet:\n")
+        buf.write(snippet)
+        if buf.tell() > MAX_CONTEXT_CHARS:
             break
 
-    dependency_bits = _collect_dependency_snippets(chunks)
-    if dependency_bits:
-        context_lines.append("\nDependency snapshots:\n" + "\n\n".join(dependency_bits))
-
-    combined = "\n\n---\n\n".join(context_lines)
-    return _limit_text(combined, MAX_CONTEXT_CHARS), sorted(set(sampled_files))
+    combined = buf.getvalue()
+    if buf.tell() > MAX_CONTEXT_CHARS:
+        combined = _limit_text(combined, MAX_CONTEXT_CHARS)
+    # Dedupe in one pass, keeping retrieval (relevance) order
+    return combined, list(dict.fromkeys(sampled_files))
 
 
 def _build_prompt(
@@ -622,83 +1137,75 @@ Full file excerpt (truncated at {MAX_FILE_CHARS} chars):
 {_limit_text(file_content, MAX_FILE_CHARS)}
 """
 
-    instructions = """
-You are an experienced application security engineer reviewing GitHub code.
-Analyze the provided context and return JSON with this shape:
-{
-  "summary": "<overall risk synopsis>",
-  "findings": [
-    {
-      "severity": "critical|high|medium|low|info",
-      "title": "<short name>",
-      "description": "<what is wrong and why it matters>",
-      "file_path": "<relative path if known>",
-      "line_hints": "<line numbers or patterns if available>",
-      "evidence": "<quote the relevant code or configuration>",
-      "remediation": "<specific fix recommendation>",
-      "category": "<CWE/OWASP label if possible>"
-    }
-  ]
-}
 
-Guidelines:
-- Severity must reflect exploitability and impact.
-- Keep findings list short (max 6) and prioritize unique issues.
-- If no issues are evident, return an empty list with a summary that explains the coverage limits.
-- NEVER include prose outside of the JSON object.
-""".strip()
-
-    prompt = f"""
-Scope: {scope.upper()} security review for {owner}/{repo}
-{f"Target file: {file_path}" if file_path else ""}
-
-{instructions}
-{hints_text}
-{file_section}
-Repository snippets and metadata:
-{context}
-"""
-    return prompt.strip()
+    # Static instructions go first and everything request-specific after them, so
+    # repeat calls share an identical prompt prefix that the provider can cache
+    buf = StringIO()
+    buf.write(_INSTRUCTIONS)
+    buf.write(f"\n\n---\nScope: {scope.upper()} security review for {owner}/{repo}\n")
+    if file_path:
+        buf.write(f"Target file: {file_path}")
+    buf.write("\n")
+    buf.write(hints_text)
+    buf.write("\n")
+    buf.write(file_section)
+    buf.write("\nRepository snippets and metadata:\n")
+    buf.write(context)
+    return buf.getvalue().strip()
 
 
 def _derive_hints(*texts: str) -> List[str]:
-    hint_keywords = {
-        "Possible credential": ["secret", "apikey", "token", "password", "aws_access"],
-        "Disabled TLS verification": ["verify=False", "NODE_TLS_REJECT_UNAUTHORIZED"],
-        "Command execution": ["exec(", "subprocess.Popen", "system(", "child_process.exec"],
-        "Weak crypto": ["md5", "sha1", "des", "rc4"],
-        "Dangerous eval": ["eval(", "Function(", "pickle.loads", "yaml.load("],
-    }
-    lowered = " ".join(texts).lower()
-    hits: List[str] = []
-    for label, needles in hint_keywords.items():
-        if any(needle in lowered for needle in needles):
-            hits.append(label)
-    return hits
+    # Scan each text in place; the regex is case-insensitive, so neither a
+    # joined copy nor a lowered copy of the (possibly large) inputs is built
+    found = set()
+    for text in texts:
+        if not text:
+            continue
+        for match in _HINT_RE.finditer(text):
+            found.add(_HINT_GROUP_LABELS[match.lastgroup])
+            # Every label already matched: nothing left to learn from the rest of the input
+            if len(found) == len(HINT_KEYWORDS):
+                return list(HINT_KEYWORDS)
+    return [label for label in HINT_KEYWORDS if label in found]
+
 
+def _parse_response(raw: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse the model's reply into {"summary", "findings"}.
 
-def _parse_response(raw: str) -> Dict[str, Any]:
+    The flag is True only when the reply contained a JSON object; otherwise the
+    raw text is returned as the summary with no findings.
+    """
     text = raw.strip()
     if text.startswith("```"):
-        # Remove Markdown fences if present
-        fence_match = re.match(r"```(?:json)?\s*(.*)```", text, re.DOTALL)
-        if fence_match:
-            text = fence_match.group(1).strip()
+        # Remove Markdown fences if present, by slicing rather than a backtracking regex.
+        # Drop the whole opening fence line so any info string (json, JSON, jsonc) goes
+        # with it, unless the JSON itself starts on that line
+        first_newline = text.find("\n")
+        if first_newline != -1 and "{" not in text[3:first_newline]:
+            body = text[first_newline + 1:]
+        else:
+            body = text[3:]
+            if body.startswith("json"):
+                body = body[4:]
+        closing = body.rfind("```")
+        if closing != -1:
+            text = body[:closing].strip()
 
     try:
-        data = json.loads(text)
+        data = _json_loads(text)
     except json.JSONDecodeError:
         # Attempt to extract the first JSON object substring.
-        candidate = re.search(r"\{.*\}", text, re.DOTALL)
+        candidate = _JSON_OBJ_RE.search(text)
         if not candidate:
-            return {"summary": text, "findings": []}
+            return {"summary": text, "findings": []}, False
         try:
-            data = json.loads(candidate.group(0))
+            data = _json_loads(candidate.group(0))
         except json.JSONDecodeError:
-            return {"summary": text, "findings": []}
+            return {"summary": text, "findings": []}, False
 
     if not isinstance(data, dict):
-        return {"summary": str(data), "findings": []}
+        return {"summary": str(data), "findings": []}, False
 
     summary = str(data.get("summary") or "").strip()
     findings_raw = data.get("findings") or []
@@ -721,28 +1228,169 @@ def _parse_response(raw: str) -> Dict[str, Any]:
                 }
             )
 
-    return {"summary": summary, "findings": findings}
+    return {"summary": summary, "findings": findings}, True
+
+
+_RESPONSE_CACHE: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_RESPONSE_CACHE_LOCK = threading.Lock()
+_RESPONSE_CACHE_DIR = os.path.join(CACHE_DIR, "llm_responses")
+
+
+def _response_cache_key(prompt: str, api_key: str) -> str:
+    # The prompt already embeds scope, owner/repo, file path and context; the API key
+    # keeps answers from one account (and its model access) from serving another
+    return hashlib.blake2b(
+        f"{CHAT_MODEL}\n{CHAT_TEMPERATURE}\n{api_key}\n{prompt}".encode("utf-8"), digest_size=20
+    ).hexdigest()
+
+
+def _response_cache_path(key: str) -> str:
+    return os.path.join(_RESPONSE_CACHE_DIR, f"{key}.json")
+
+
+def _response_cache_lookup(key: str) -> Optional[Dict[str, Any]]:
+    now = time.monotonic()
+    with _RESPONSE_CACHE_LOCK:
+        cached = _RESPONSE_CACHE.get(key)
+        if cached and now - cached[0] < RESPONSE_CACHE_TTL_SECONDS:
+            _RESPONSE_CACHE.move_to_end(key)
+            return copy.deepcopy(cached[1])
+        _RESPONSE_CACHE.pop(key, None)
+
+    # Fall back to the disk tier, promoting a fresh entry into memory
+    path = _response_cache_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) >= RESPONSE_DISK_CACHE_TTL_SECONDS:
+            _remove_quietly(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            parsed = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    _response_cache_store(key, parsed, persist=False)
+    return parsed
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _prune_response_disk_cache() -> None:
+    """Delete expired response files, then the oldest ones beyond RESPONSE_DISK_CACHE_MAX_FILES."""
+    cutoff = time.time() - RESPONSE_DISK_CACHE_TTL_SECONDS
+    entries = []
+    try:
+        with os.scandir(_RESPONSE_CACHE_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if mtime < cutoff:
+                    _remove_quietly(entry.path)
+                else:
+                    entries.append((mtime, entry.path))
+    except OSError:
+        return
 
+    excess = len(entries) - RESPONSE_DISK_CACHE_MAX_FILES
+    if excess > 0:
+        entries.sort()
+        for _, path in entries[:excess]:
+            _remove_quietly(path)
 
-def _invoke_model(prompt: str, api_key: str) -> Dict[str, Any]:
-    llm = ChatOpenAI(
-        model="gpt-5-nano",
-        temperature=0.1,
+
+def _response_cache_store(key: str, parsed: Dict[str, Any], persist: bool = True) -> None:
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE[key] = (time.monotonic(), copy.deepcopy(parsed))
+        _RESPONSE_CACHE.move_to_end(key)
+        while len(_RESPONSE_CACHE) > RESPONSE_CACHE_MAX_ENTRIES:
+            _RESPONSE_CACHE.popitem(last=False)
+
+    if persist:
+        try:
+            _write_json_atomic(_response_cache_path(key), parsed)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: Could not write LLM response cache: {e}")
+            return
+        _prune_response_disk_cache()
+
+
+@lru_cache(maxsize=4)
+def _get_chat_model(api_key: str) -> ChatOpenAI:
+    """Chat client per API key, reused for the process lifetime (keeps its HTTP connections warm)."""
+    return ChatOpenAI(
+        model=CHAT_MODEL,
+        temperature=CHAT_TEMPERATURE,
         api_key=api_key,
     )
-    response = llm.invoke(prompt)
-    return _parse_response(response.content)
 
 
-def run_repo_security_assessment(api_key: str, github_url: Optional[str] = None, owner: Optional[str] = None, repo: Optional[str] = None) -> Dict[str, Any]:
+def _stream_completion(llm: ChatOpenAI, prompt: str) -> str:
+    # Stream tokens into a buffer as they are generated rather than waiting on one
+    # blocking completion; parsing still needs the whole JSON object
+    buf = StringIO()
+    for chunk in llm.stream(prompt):
+        if isinstance(chunk.content, str):
+            buf.write(chunk.content)
+    return buf.getvalue()
+
+
+async def _ainvoke_model(prompt: str, api_key: str) -> Dict[str, Any]:
+    """
+    Run the prompt through the chat model, reusing a recent identical answer.
+
+    Parsed responses are kept in a bounded in-memory LRU for
+    RESPONSE_CACHE_TTL_SECONDS, backed by JSON files under CACHE_DIR kept for
+    RESPONSE_DISK_CACHE_TTL_SECONDS; callers get a copy so they can mutate freely.
+    Replies that were not valid JSON are returned but never cached, so one
+    malformed answer is retried on the next request instead of pinned.
+    """
+    key = _response_cache_key(prompt, api_key)
+    cached = _response_cache_lookup(key)
+    if cached is not None:
+        return cached
+
+    llm = _get_chat_model(api_key)
+    # The shared client's connection pool is synchronous (each request runs its own
+    # event loop via asyncio.run, so an async pool cannot be reused); stream on a
+    # worker thread to keep the loop free
+    raw = await asyncio.to_thread(_stream_completion, llm, prompt)
+    parsed, is_json = _parse_response(raw)
+
+    if is_json:
+        _response_cache_store(key, parsed)
+    return parsed
+
+
+async def arun_repo_security_assessment(
+    api_key: str,
+    github_url: Optional[str] = None,
+    owner: Optional[str] = None,
+    repo: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async repository assessment: blocking retrieval runs in worker threads and
+    the LLM call is awaited, so the event loop stays free for other requests.
+    """
     owner, repo = _ensure_repo_inputs(github_url, owner, repo)
     print(f"\n=== Starting security assessment for {owner}/{repo} ===")
-    chunks = _fetch_chunks(owner, repo, api_key=api_key)
-    context, sampled_files = _format_context(owner, repo, chunks)
+    chunks, dependency_chunks = await asyncio.gather(
+        asyncio.to_thread(_fetch_chunks, owner, repo, api_key=api_key),
+        asyncio.to_thread(_fetch_dependency_chunks, owner, repo),
+    )
+    context, sampled_files = _format_context(owner, repo, chunks, dependency_chunks=dependency_chunks)
     hints = _derive_hints(context)
     prompt = _build_prompt("repo", owner, repo, context, hints=hints)
     print(f"Invoking LLM for security analysis...")
-    parsed = _invoke_model(prompt, api_key)
+    parsed = await _ainvoke_model(prompt, api_key)
     print(f"Assessment complete: {len(parsed.get('findings', []))} findings\n")
     return {
         "scope": "repo",
@@ -757,27 +1405,32 @@ def run_repo_security_assessment(api_key: str, github_url: Optional[str] = None,
     }
 
 
-def run_file_security_assessment(
+async def arun_file_security_assessment(
     api_key: str,
     file_path: str,
     github_url: Optional[str] = None,
     owner: Optional[str] = None,
     repo: Optional[str] = None,
 ) -> Dict[str, Any]:
+    """Async file assessment; see arun_repo_security_assessment."""
     if not file_path:
         raise ValueError("file_path is required for file-level security assessment.")
 
     owner, repo = _ensure_repo_inputs(github_url, owner, repo)
+
+    # The GitHub download and the Elasticsearch lookup are independent, so run them together.
+    # For file-level assessment, api_key is not needed (uses simple retrieval)
     try:
-        file_content = get_file_content(owner, repo, file_path)
+        file_content, chunks = await asyncio.gather(
+            asyncio.to_thread(_get_file_content_cached, owner, repo, file_path),
+            asyncio.to_thread(_fetch_chunks, owner, repo, file_path=file_path, api_key=None),
+        )
     except UnknownObjectException as exc:
         raise ValueError(f"Unable to fetch {file_path}: {exc}")
 
     if not file_content:
         raise ValueError("File content is empty or could not be decoded.")
 
-    # For file-level assessment, api_key is not needed (uses simple retrieval)
-    chunks = _fetch_chunks(owner, repo, file_path=file_path, api_key=None)
     context, sampled_files = _format_context(owner, repo, chunks)
     hints = _derive_hints(file_content, context)
     prompt = _build_prompt(
@@ -789,7 +1442,7 @@ def run_file_security_assessment(
         file_content=file_content,
         hints=hints,
     )
-    parsed = _invoke_model(prompt, api_key)
+    parsed = await _ainvoke_model(prompt, api_key)
     return {
         "scope": "file",
         "owner": owner,
@@ -802,3 +1455,22 @@ def run_file_security_assessment(
         "github_token_present": bool(GITHUB_TOKEN),
         "context_source": "elasticsearch" if chunks else "file_only",
     }
+
+
+# Synchronous entry points for WSGI (Flask) routes, which have no running event loop.
+# Async callers should await the arun_* coroutines directly.
+
+def run_repo_security_assessment(api_key: str, github_url: Optional[str] = None, owner: Optional[str] = None, repo: Optional[str] = None) -> Dict[str, Any]:
+    return asyncio.run(arun_repo_security_assessment(api_key, github_url=github_url, owner=owner, repo=repo))
+
+
+def run_file_security_assessment(
+    api_key: str,
+    file_path: str,
+    github_url: Optional[str] = None,
+    owner: Optional[str] = None,
+    repo: Optional[str] = None,
+) -> Dict[str, Any]:
+    return asyncio.run(
+        arun_file_security_assessment(api_key, file_path, github_url=github_url, owner=owner, repo=repo)
+    )
@@ -4,25 +4,99 @@ Demo script showing RepoRover backend ingestion pipeline progress.
 This script simulates the full ingestion flow without hitting external APIs.
 """
 
+import ast
+import asyncio
+import os
+import re
+import tempfile
 import time
-import random
-from typing import List
+from itertools import accumulate, islice
+from typing import List, Optional
+
+import numpy as np
+
+from embedding_cache import CachedEmbedder
+
+EMBEDDING_DIM = 768
+BULK_CHUNK_SIZE = 500
+EMBEDDING_CACHE_PATH = os.path.join(tempfile.gettempdir(), "reporover_demo_embeddings.sqlite3")
+RNG = np.random.default_rng()
+# Top-level definition starts, found in one C-level scan instead of a per-line loop
+_SPLIT_RE = re.compile(r"^(?:def |class )", re.MULTILINE)
+FETCH_CONCURRENCY = 8  # Concurrent downloads in flight
+EMBED_BATCH_SIZE = 512  # Inputs per embedding request
+EMBED_BATCH_MAX_TOKENS = 300_000  # OpenAI per-request token limit
+
+try:
+    import tiktoken
+    _ENCODER = tiktoken.encoding_for_model("text-embedding-ada-002")
+except Exception:
+    _ENCODER = None
+
+def estimate_tokens(text: str) -> int:
+    """Token count for the embedding model, or a conservative estimate without tiktoken."""
+    if _ENCODER is not None:
+        return len(_ENCODER.encode(text))
+    return max(1, len(text) // 3)
+
+def iter_embedding_batches(texts: List[str]):
+    """Yield (start, end) ranges that respect both the input and token limits per request."""
+    start = 0
+    batch_tokens = 0
+    for end, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if end > start and (end - start >= EMBED_BATCH_SIZE
+                            or batch_tokens + tokens > EMBED_BATCH_MAX_TOKENS):
+            yield start, end
+            start, batch_tokens = end, 0
+        batch_tokens += tokens
+    if start < len(texts):
+        yield start, len(texts)
 
 class DemoEmbeddings:
-    """Mock embeddings for demo purposes."""
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+    """
+    Mock embeddings for demo purposes.
+
+    Rows are L2-normalized once at generation time, matching the invariant the
+    real index relies on, so similarity is a plain dot product everywhere else.
+    """
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Return an (N, EMBEDDING_DIM) float32 matrix with one unit-length row per text."""
         time.sleep(0.5)  # Simulate processing time
-        return [[random.random() for _ in range(768)] for _ in texts]
+        emb = RNG.random((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+        return emb
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).tolist()
+
+def rank_similar_pairs(emb: np.ndarray, top_k: Optional[int] = None) -> List[tuple]:
+    """
+    Rank pairs of chunks by cosine similarity, most similar first.
+
+    Rows are unit length, so cosine similarity is the dot product and the full
+    pairwise matrix is a single matmul with no per-pair norm division. With
+    top_k, only the best pairs are selected (argpartition) before sorting.
+    """
+    sim = emb @ emb.T
+    i, j = np.triu_indices(len(emb), k=1)
+    pair_sims = sim[i, j]
+    if top_k is not None and top_k < len(pair_sims):
+        best = np.argpartition(-pair_sims, top_k - 1)[:top_k]
+        order = best[np.argsort(-pair_sims[best])]
+    else:
+        order = np.argsort(-pair_sims)
+    return list(zip(i[order].tolist(), j[order].tolist(), pair_sims[order].tolist()))
 
 class DemoElasticsearch:
     """Mock Elasticsearch for demo purposes."""
     def __init__(self):
         self.indexed_chunks = 0
 
-    def index(self, index: str, body: dict):
-        time.sleep(0.1)  # Simulate indexing time
-        self.indexed_chunks += 1
-        return {"_id": f"mock_{self.indexed_chunks}"}
+    def bulk(self, actions: List[dict]):
+        time.sleep(0.1)  # Simulate one round-trip per bulk request
+        self.indexed_chunks += len(actions)
+        return {"errors": False, "items": [{"index": {"_id": a["_id"]}} for a in actions]}
 
 def simulate_github_fetch(owner: str, repo: str) -> List[str]:
     """Simulate fetching files from a GitHub repository."""
@@ -45,10 +119,10 @@ def simulate_github_fetch(owner: str, repo: str) -> List[str]:
     print(f"✅ Found {len(files)} processable files")
     return files
 
-def simulate_file_content(owner: str, repo: str, file_path: str) -> str:
+async def simulate_file_content(owner: str, repo: str, file_path: str) -> str:
     """Simulate fetching content for a specific file."""
     print(f"📥 Downloading content: {file_path}")
-    time.sleep(0.3)
+    await asyncio.sleep(0.3)  # Simulate network round-trip without blocking the loop
 
     # Mock content based on file type
     if file_path.endswith(".md"):
@@ -71,69 +145,157 @@ if __name__ == "__main__":
 
     return content
 
+async def fetch_all_contents(owner: str, repo: str, file_paths: List[str]) -> List[str]:
+    """Download all files concurrently (at most FETCH_CONCURRENCY in flight), in input order."""
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch_one(file_path: str) -> str:
+        async with semaphore:
+            return await simulate_file_content(owner, repo, file_path)
+
+    return await asyncio.gather(*(fetch_one(file_path) for file_path in file_paths))
+
+def python_segments(content: str) -> List[str]:
+    """
+    Split Python source at top-level statements using the C-implemented parser.
+
+    Each segment starts at a top-level def/class/statement (including its
+    decorators) and runs to the next one, so segments cover the whole file and
+    never break inside a string or docstring. Raises SyntaxError on invalid code.
+    """
+    tree = ast.parse(content)
+    line_offsets = [0, *accumulate(len(line) for line in content.splitlines(keepends=True))]
+    starts = sorted({0} | {
+        line_offsets[min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1]
+        for node in tree.body
+    })
+    return [content[start:end] for start, end in zip(starts, starts[1:] + [len(content)])]
+
+def pack_segments(segments: List[str], chunk_size: int = 1000) -> List[str]:
+    """Greedily pack consecutive segments into chunks of at most chunk_size characters."""
+    chunks = []
+    current = ""
+    for segment in segments:
+        if current and len(current) + len(segment) > chunk_size:
+            chunks.append(current.strip())
+            current = ""
+        current += segment
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
 def simulate_text_splitting(content: str, file_path: str) -> List[str]:
     """Simulate LangChain text splitting."""
     print(f"✂️  Splitting text into chunks: {file_path}")
 
-    # Simple mock splitting
-    sentences = content.split('\n')
+    if file_path.endswith(".py"):
+        try:
+            chunks = pack_segments(python_segments(content))
+            print(f"📦 Created {len(chunks)} text chunks ({sum(len(c) for c in chunks)} characters total)")
+            return chunks
+        except SyntaxError:
+            pass  # Not valid Python; fall back to regex/line-based splitting
+
+    boundaries = [m.start() for m in _SPLIT_RE.finditer(content)]
+    if boundaries:
+        starts = [0] + boundaries if boundaries[0] else boundaries
+        segments = [content[a:b] for a, b in zip(starts, starts[1:] + [len(content)])]
+        chunks = pack_segments(segments)
+        print(f"📦 Created {len(chunks)} text chunks ({sum(len(c) for c in chunks)} characters total)")
+        return chunks
+
+    # Simple mock splitting. Chunks are tracked as offsets into content and sliced
+    # once when emitted, instead of growing a string line by line.
     chunks = []
-    current_chunk = ""
+    chunk_start = 0
     chunk_size = 0
-
-    for sentence in sentences:
-        if chunk_size + len(sentence) > 1000:
-            chunks.append(current_chunk.strip())
-            current_chunk = sentence
-            chunk_size = len(sentence)
+    line_start = 0
+    content_len = len(content)
+
+    while True:
+        line_end = content.find("\n", line_start)
+        if line_end == -1:
+            line_end = content_len
+        line_len = line_end - line_start
+        if chunk_size + line_len > 1000:
+            chunks.append(content[chunk_start:line_start].strip())
+            chunk_start = line_start
+            chunk_size = line_len
+            chunk_empty = line_len == 0
         else:
-            current_chunk += "\n" + sentence
-            chunk_size += len(sentence)
+            chunk_size += line_len
+            chunk_empty = False
+        if line_end == content_len:
+            break
+        line_start = line_end + 1
 
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if not chunk_empty:
+        chunks.append(content[chunk_start:].strip())
 
     print(f"📦 Created {len(chunks)} text chunks ({sum(len(c) for c in chunks)} characters total)")
     return chunks
 
 def simulate_embeddings_generation(chunks: List[str]) -> List[List[float]]:
-    """Simulate Open AI API embeddings generation."""
-    print("🧠 Generating embeddings with Open AI API")
+    """Simulate Open AI API embeddings generation, batching chunks from all files."""
+    print(f"🧠 Generating embeddings with Open AI API for {len(chunks)} chunks")
 
-    embeddings_model = DemoEmbeddings()
+    # Same persistent cache the ingestion pipeline uses, kept in a demo-only file
+    embeddings_model = CachedEmbedder(DemoEmbeddings(), model_name="demo-embeddings", path=EMBEDDING_CACHE_PATH)
 
     start_time = time.time()
-    embeddings = embeddings_model.embed_documents(chunks)
+    batches = []
+    try:
+        for start, end in iter_embedding_batches(chunks):
+            batches.append(np.asarray(embeddings_model.embed_documents(chunks[start:end]), dtype=np.float32))
+    finally:
+        embeddings_model.close()
+    emb = np.concatenate(batches) if batches else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
     elapsed = time.time() - start_time
 
-    print(f"🤖 Generated {len(embeddings)} embeddings in {elapsed:.2f} seconds")
-    return embeddings
+    print(f"🤖 Generated {len(emb)} embeddings in {len(batches)} batch(es) in {elapsed:.2f} seconds "
+          f"({embeddings_model.hits} cache hits, {embeddings_model.misses} misses)")
+
+    pairs = rank_similar_pairs(emb, top_k=1)
+    if pairs:
+        i, j, score = pairs[0]
+        print(f"🔗 Most similar chunks: #{i} and #{j} (cosine {score:.3f})")
+
+    return emb.tolist()
+
 def simulate_elasticsearch_indexing(chunks: List[str], embeddings: List[List[float]],
                                    owner: str, repo: str, file_path: str):
     """Simulate indexing chunks in Elasticsearch."""
     print("📊 Indexing chunks in Elasticsearch vector database")
 
     es = DemoElasticsearch()
-
-    indexed = 0
-    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-        # Mock document
-        doc = {
-            "repo_owner": owner,
-            "repo_name": repo,
-            "file_path": file_path,
-            "content": chunk,
-            "metadata": {"chunk_index": i},
-            "embedding": embedding,
-            "chunk_id": f"demo_{i}",
-            "timestamp": int(time.time())
+    timestamp = int(time.time())
+
+    # Fields shared by every chunk of this file are built once
+    base = {"repo_owner": owner, "repo_name": repo, "file_path": file_path, "timestamp": timestamp}
+
+    # Actions are generated lazily and consumed one bulk batch at a time,
+    # so no list of every document for the file is ever built
+    actions = (
+        {
+            "_index": "repo_chunks",
+            "_id": f"demo_{i}",
+            "_source": {
+                **base,
+                "content": chunk,
+                "metadata": {"chunk_index": i},
+                "embedding": embedding,
+                "chunk_id": f"demo_{i}",
+            }
         }
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    )
 
-        result = es.index("repo_chunks", doc)
-        indexed += 1
-
-        if indexed % 3 == 0:
-            print(f"✅ Indexed {indexed}/{len(chunks)} chunks")
+    # One bulk request per BULK_CHUNK_SIZE documents instead of one request per chunk
+    indexed = 0
+    while batch := list(islice(actions, BULK_CHUNK_SIZE)):
+        es.bulk(batch)
+        indexed += len(batch)
+        print(f"✅ Indexed {indexed}/{len(chunks)} chunks")
 
     print(f"🎉 Successfully indexed all {len(chunks)} chunks from {file_path}")
 
@@ -157,20 +319,29 @@ def main():
     # Process a few files for demo (limit to keep it fast)
     demo_files = files[:3]  # Process first 3 files
 
-    for i, file_path in enumerate(demo_files):
-        print(f"🔄 Processing file {i+1}/{len(demo_files)}: {file_path}")
+    # Step 2: Get file contents (downloads run concurrently on one event loop)
+    contents = asyncio.run(fetch_all_contents(owner, repo, demo_files))
+    print()
 
-        # Step 2: Get file content
-        content = simulate_file_content(owner, repo, file_path)
+    # Step 3: Split text for every file, remembering where each file's chunks start
+    file_chunks = []
+    for i, (file_path, content) in enumerate(zip(demo_files, contents)):
+        print(f"🔄 Processing file {i+1}/{len(demo_files)}: {file_path}")
         print(f"📏 Content length: {len(content)} characters")
+        file_chunks.append(simulate_text_splitting(content, file_path))
+    print()
 
-        # Step 3: Split text
-        chunks = simulate_text_splitting(content, file_path)
-
-        # Step 4: Generate embeddings
-        embeddings = simulate_embeddings_generation(chunks)
+    # Step 4: Generate embeddings for all files' chunks together, so small files
+    # share embedding requests instead of costing one round-trip each
+    all_chunks = [chunk for chunks in file_chunks for chunk in chunks]
+    all_embeddings = simulate_embeddings_generation(all_chunks)
+    print()
 
-        # Step 5: Index in Elasticsearch
+    # Step 5: Index in Elasticsearch, scattering embeddings back to their files
+    offset = 0
+    for file_path, chunks in zip(demo_files, file_chunks):
+        embeddings = all_embeddings[offset:offset + len(chunks)]
+        offset += len(chunks)
         simulate_elasticsearch_indexing(chunks, embeddings, owner, repo, file_path)
 
         print(f"✅ Completed processing: {file_path}")
@@ -5,7 +5,37 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Now import and test
-import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Component imports are done once per process (langchain's are slow to import);
+# a missing dependency only fails the tests that need it
+try:
+    from ingest_pipeline import (
+        INDEX_DEFINITION,
+        INDEX_NAME,
+        get_elasticsearch_client,
+        ingest_github_repo,
+        search_similar_chunks,
+    )
+    PIPELINE_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: ingest_pipeline unavailable ({e})")
+    PIPELINE_AVAILABLE = False
+
+try:
+    from github_utils import get_repo_files, get_file_content
+    GITHUB_UTILS_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: github_utils unavailable ({e})")
+    GITHUB_UTILS_AVAILABLE = False
+
+try:
+    from chunking import split_then_merge, splitter_for
+    CHUNKING_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: chunking unavailable ({e})")
+    CHUNKING_AVAILABLE = False
 
 def test_ingestion():
     """Test the complete ingestion pipeline with Elasticsearch."""
@@ -14,6 +44,10 @@ def test_ingestion():
     # Sample repo - using your actual repository for demonstration
     repo_url = "https://github.com/elipaulman/GOVS"  # Your actual repo
 
+    if not PIPELINE_AVAILABLE:
+        print("❌ ingest_pipeline could not be imported")
+        return False
+
     try:
         print(f"Starting ingestion of {repo_url}...")
 
@@ -29,24 +63,13 @@ def test_ingestion():
             return False
 
         # Check if index exists and create if needed
-        index_name = "repo_chunks"
+        # Use the pipeline's own mapping so the test index matches what ingestion writes
+        index_name = INDEX_NAME
         if es.indices.exists(index=index_name):
             print(f"✅ Index '{index_name}' already exists")
         else:
             print(f"📦 Creating index '{index_name}'...")
-            es.indices.create(index=index_name, body={
-                "mappings": {
-                    "properties": {
-                        "repo_owner": {"type": "keyword"},
-                        "repo_name": {"type": "keyword"},
-                        "file_path": {"type": "keyword"},
-                        "content": {"type": "text"},
-                        "embedding": {"type": "dense_vector", "dims": 768},
-                        "chunk_id": {"type": "keyword"},
-                        "timestamp": {"type": "date"}
-                    }
-                }
-            })
+            es.indices.create(index=index_name, body=INDEX_DEFINITION)
             print(f"✅ Created index '{index_name}'")
 
         # Ingest the repository
@@ -61,7 +84,6 @@ def test_ingestion():
         return True
     except Exception as e:
         print(f"❌ Error during ingestion: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -69,6 +91,10 @@ def test_search():
     """Test the search functionality."""
     print("\nTesting search functionality...")
 
+    if not PIPELINE_AVAILABLE:
+        print("⚠️  ingest_pipeline could not be imported, using mock data for testing")
+        return test_search_with_mock_data()
+
     try:
         # Test Elasticsearch connection first
         try:
@@ -87,9 +113,12 @@ def test_search():
             "README"
         ]
 
-        for query in test_queries:
+        # Queries are latency-bound, so run them all at once on the shared client
+        with ThreadPoolExecutor(max_workers=len(test_queries)) as executor:
+            all_results = list(executor.map(lambda q: search_similar_chunks(q, top_k=3), test_queries))
+
+        for query, results in zip(test_queries, all_results):
             print(f"\nSearching for: '{query}'")
-            results = search_similar_chunks(query, top_k=3)
 
             if results:
                 print(f"✅ Found {len(results)} results:")
@@ -102,7 +131,6 @@ def test_search():
         return True
     except Exception as e:
         print(f"❌ Error during search: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -144,10 +172,14 @@ def test_search_with_mock_data():
 
         test_queries = ["function", "class", "README"]
 
+        # Lowercase each document once rather than once per query
+        lowered_contents = [r['content'].lower() for r in mock_results]
+
         for query in test_queries:
             print(f"\nSearching for: '{query}'")
             # Filter mock results based on query
-            filtered_results = [r for r in mock_results if query.lower() in r['content'].lower()]
+            query_lower = query.lower()
+            filtered_results = [r for r, content in zip(mock_results, lowered_contents) if query_lower in content]
 
             if filtered_results:
                 print(f"✅ Found {len(filtered_results)} results:")
@@ -166,10 +198,12 @@ def test_basic_functionality():
     """Test basic functionality without requiring full pipeline."""
     print("\n🧪 Testing basic functionality...")
 
+    if not GITHUB_UTILS_AVAILABLE:
+        print("❌ github_utils could not be imported")
+        return False
+
     try:
         # Test GitHub API integration
-        from github_utils import get_repo_files, get_file_content
-
         print("Testing GitHub API integration...")
         files = get_repo_files("elipaulman", "GOVS")
         print(f"✅ Found {len(files)} files in GOVS repo")
@@ -179,24 +213,31 @@ def test_basic_functionality():
         print(f"✅ Retrieved README.md ({len(readme_content)} characters)")
 
         # Test text splitting
-        from langchain.text_splitter import RecursiveCharacterTextSplitter
-
         print("Testing text splitting...")
         try:
-            # Simple text splitting without TextLoader for testing
-            splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            chunks = splitter.split_text(readme_content)
+            # Recursive split plus merge/fold post-pass, without TextLoader for testing
+            if not CHUNKING_AVAILABLE:
+                raise ImportError("chunking could not be imported")
+            chunks = split_then_merge(readme_content)
             print(f"✅ Split into {len(chunks)} chunks")
         except Exception as e:
             print(f"⚠️  Text splitting test failed: {e}")
-            # Fallback: simple character-based splitting
-            chunk_size = 1000
+            # Fallback: simple character-based splitting, with ~20% overlap so text cut
+            # at a boundary still appears whole in one of the two chunks
+            chunk_size, overlap = 1000, 200
             chunks = []
-            for i in range(0, len(readme_content), chunk_size):
+            for i in range(0, max(len(readme_content) - overlap, 1), chunk_size - overlap):
                 chunk = readme_content[i:i + chunk_size]
                 chunks.append(chunk)
             print(f"✅ Fallback split into {len(chunks)} chunks")
 
+        # Test language-aware splitting: each file gets the splitter for its extension
+        if CHUNKING_AVAILABLE:
+            for file_path in files[:3]:
+                content = get_file_content("elipaulman", "GOVS", file_path)
+                file_chunks = splitter_for(file_path).split_text(content)
+                print(f"✅ Split {file_path} into {len(file_chunks)} chunks")
+
         return True
     except Exception as e:
         print(f"❌ Error in basic functionality test: {e}")